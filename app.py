@@ -6,56 +6,87 @@ Created on Fri Nov 29 16:45:25 2024
 """
 
 import os
-import yfinance as yf
+import argparse
 from dotenv import load_dotenv
-from crewai import Agent, Task, Crew
-from langchain_groq import ChatGroq
 from pathlib import Path
-import litellm
+
+# crewai, langchain_groq and litellm are imported when the research starts
+from stock_llm_cache import ResponseCache
+from stock_llm_gateway import LLMGateway
+from stock_prompts import DEFAULT_TOKEN_BUDGET, StockPrompts
+from stock_records import PriceHistories, TickerData
+from stock_results import ResultStore
+from stock_tracing import EXPORT_FORMATS, Tracer
+from stock_utils import StockUtils
 
 # Provide the full path to the .env file
 env_path = Path('configs') / '.env'
 load_dotenv(dotenv_path=env_path)
 
-# Configure LiteLLM to use Groq
-litellm.set_verbose = False
-litellm.api_key = ""
-
 # Function to initialize Groq LLM
 def initialize_groq_llm():
+    import litellm
+    from langchain_groq import ChatGroq
+    
+    # Configure LiteLLM to use Groq
+    litellm.set_verbose = False
+    litellm.api_key = ""
     return ChatGroq(
         groq_api_key="",
         model="groq/llama-3.1-70b-versatile",
         temperature=0.7
     )
 
+# Key statistics used in the prompts, keyed by their yfinance field names
+INFO_FIELDS = {
+    'currentPrice': 'current_price',
+    'marketCap': 'market_cap',
+    'trailingPE': 'pe_ratio',
+    'dividendYield': 'dividend_yield'
+}
+
 # Function to fetch stock data
-def fetch_stock_data(tickers, period='1mo'):
+def fetch_stock_data(tickers, period='1mo', max_workers=8, timeout=30):
     """
     Fetch stock data for given tickers
     :param tickers: List of stock tickers
     :param period: Data retrieval period
-    :return: Dictionary of stock data
+    :param max_workers: Maximum number of key statistics requests in flight
+    :param timeout: Per-ticker timeout in seconds
+    :return: Dictionary of ticker -> TickerData (tickers that failed are left out)
     """
-    stock_data = {}
+    # Historical data for all tickers in one multi-symbol request
+    with Tracer.span('history', tickers=len(tickers)):
+        history = StockUtils.download_history(tickers, period)
+    failures = history.attrs.pop('errors', {})
+    with_history = history.columns.get_level_values('Ticker').unique()
+
+    # Key statistics: price from the history above, the rest from the quote
+    # endpoint or cache; the full `info` payload only for P/E and dividend yield
+    with Tracer.span('info', tickers=len(with_history)):
+        info, errors = StockUtils.fundamentals().get_many(
+            [ticker for ticker in tickers if ticker in with_history], list(INFO_FIELDS),
+            history, max_workers, timeout
+        )
     for ticker in tickers:
-        stock = yf.Ticker(ticker)
-        # Fetch historical data
-        hist = stock.history(period=period)
-        
-        # Get key statistics
-        info = stock.info
-        stock_data[ticker] = {
-            'history': hist,
-            'current_price': info.get('currentPrice', 0),
-            'market_cap': info.get('marketCap', 0),
-            'pe_ratio': info.get('trailingPE', 0),
-            'dividend_yield': info.get('dividendYield', 0)
-        }
-    return stock_data
+        if ticker not in with_history:
+            print(f"Could not fetch data for {ticker}: {failures.get(ticker, 'no price history')}")
+        elif ticker in errors:
+            print(f"Could not fetch data for {ticker}: {errors[ticker]}")
+
+    # All histories share one float32 array; each ticker only holds a view of its row
+    histories = PriceHistories.from_frame(history[[ticker for ticker in info if ticker not in errors]])
+    return {
+        ticker: TickerData(
+            ticker, histories[ticker], **{name: values.get(field, 0) for field, name in INFO_FIELDS.items()}
+        )
+        for ticker, values in info.items() if ticker not in errors
+    }
 
 # Create Agents
 def create_agents(llm):
+    from crewai import Agent
+    
     return [
         Agent(
             role="Market Analysis Manager",
@@ -81,12 +112,16 @@ def create_agents(llm):
     ]
 
 # Create Tasks
-def create_tasks(agents, stock_data):
+def create_tasks(agents, stock_data, token_budget=DEFAULT_TOKEN_BUDGET):
+    from crewai import Task
+    
+    # Bounded, compact summary instead of the raw dict with its DataFrames
+    payload = StockPrompts.build_payload(stock_data, token_budget)
     return [
         Task(
             description=f"""
             Conduct a comprehensive market analysis using the following stock data:
-            {stock_data}
+            {payload}
             
             Provide a detailed report including:
             - Overall market trends
@@ -106,7 +141,7 @@ def create_tasks(agents, stock_data):
         Task(
             description=f"""
             Develop intraday trading strategies based on the following market data:
-            {stock_data}
+            {payload}
             
             Create a strategic trading plan that includes:
             - Short-term trading opportunities
@@ -126,7 +161,7 @@ def create_tasks(agents, stock_data):
         Task(
             description=f"""
             Design a long-term portfolio strategy considering:
-            {stock_data}
+            {payload}
             
             Develop a comprehensive investment approach that includes:
             - Asset allocation recommendations
@@ -145,35 +180,63 @@ def create_tasks(agents, stock_data):
         )
     ]
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="AI research report for a few stocks")
+    parser.add_argument('--timings', action='store_true', help="Print a per-stage timing breakdown")
+    parser.add_argument('--trace', metavar='PATH', help="Write the run's spans to PATH")
+    parser.add_argument('--trace-format', default='chrome', choices=EXPORT_FORMATS,
+                        help="chrome (chrome://tracing, Perfetto) or otel (OTLP JSON)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    # Always traced: the saved run keeps its timings and token counts
+    tracer = Tracer()
+    
     # Define stock tickers
     tickers = ['AAPL', 'MSFT', 'GOOGL', 'AMZN']
     
-    # Initialize LLM
-    llm = initialize_groq_llm()
-    
-    # Fetch stock data
-    stock_data = fetch_stock_data(tickers)
-    
-    # Create agents and tasks
-    agents = create_agents(llm)
-    tasks = create_tasks(agents, stock_data)
-    
-    # Create and run the crew
-    crew = Crew(
-        agents=agents,
-        tasks=tasks,
-        verbose=True
-    )
-    
-    # Kickoff the research
-    results = crew.kickoff()
+    with tracer.activate():
+        # Load the LLM/agent stack, then initialize LLM
+        with Tracer.span('imports'):
+            from stock_crew import StockCrew
+        llm = initialize_groq_llm()
+        
+        # Fetch stock data
+        stock_data = fetch_stock_data(tickers)
+        
+        # Create agents and tasks
+        with Tracer.span('tasks'):
+            agents = create_agents(llm)
+            tasks = create_tasks(agents, stock_data)
+        
+        # Create and run the crew, reusing cached answers for identical prompts;
+        # the three analyses are independent, so they run side by side
+        cache = ResponseCache()
+        crew = StockCrew(agents, tasks, llm, cache=cache, process='parallel', gateway=LLMGateway.shared())
+        
+        # Kickoff the research
+        results = crew.kickoff()
     
     # Print results
     print("\n === Research Results ===")
-    for i, result in enumerate(results, 1):
+    for i, result in enumerate(results.tasks_output, 1):
         print(f"\nTask {i} Result:")
-        print(result)
+        print(result.raw)
+    print(f"\nLLM cache: {cache.stats()}")
+    
+    # Keep the run for later lookups (python stock_results.py --show <run id>)
+    run_id = ResultStore().save(
+        'script', list(stock_data), '1mo', stock_data.values(), ResultStore.crew_outputs(results, crew),
+        model=getattr(llm, 'model_name', None) or getattr(llm, 'model', None), tracer=tracer
+    )
+    print(f"Saved as run {run_id}")
+    
+    if args.timings:
+        print("\n === Timings ===")
+        print(tracer.report())
+    if args.trace:
+        print(f"\nTrace written to {tracer.export(args.trace, args.trace_format)}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,32 +1,31 @@
 import os
 import streamlit as st
-import yfinance as yf
 from dotenv import load_dotenv
-from crewai import Agent, Task, Crew
-from langchain_groq import ChatGroq
 from pathlib import Path
-import pandas as pd
-import litellm
+
+from stock_universe import StockUniverse
 
 # Load environment variables
 env_path = Path('./config') / '.env'
 load_dotenv(dotenv_path=env_path)
 
-# Configure LiteLLM
-litellm.set_verbose = False
-litellm.api_key = os.getenv("GROQ_API_KEY")
-
 # Function to fetch S&P 500 tickers
 def get_sp500_tickers():
     try:
-        sp500_table = pd.read_html('https://en.wikipedia.org/wiki/List_of_S%26P_500_companies')[0]
-        return sorted(sp500_table['Symbol'].tolist())
+        return StockUniverse.get_tickers()
     except Exception as e:
         st.error(f"Error fetching S&P 500 tickers: {e}")
         return []
 
 # Function to initialize Groq LLM
 def initialize_groq_llm():
+    # The LLM stack is only imported once a research run starts
+    import litellm
+    from langchain_groq import ChatGroq
+    
+    # Configure LiteLLM
+    litellm.set_verbose = False
+    litellm.api_key = os.getenv("GROQ_API_KEY")
     return ChatGroq(
         groq_api_key=os.getenv("GROQ_API_KEY"),
         model="groq/llama-3.1-70b-versatile",
@@ -35,6 +34,8 @@ def initialize_groq_llm():
 
 # Simplified stock data summary
 def summarize_stock_data(ticker, period='1mo'):
+    import yfinance as yf
+    
     try:
         stock = yf.Ticker(ticker)
         
@@ -59,6 +60,8 @@ def summarize_stock_data(ticker, period='1mo'):
 
 # Create Agents with extremely concise roles
 def create_agents(llm):
+    from crewai import Agent
+    
     return [
         Agent(
             role="Technical indicator analyst",
@@ -78,6 +81,8 @@ def create_agents(llm):
 
 # Create Tasks with extremely minimal descriptions
 def create_tasks(agents, stock_data):
+    from crewai import Task
+    
     # Minimal stock summary string
     stock_summary = " | ".join([
         f"{stock['ticker']}(Price:${stock['current_price']},Change:{stock['price_change_pct']}%,Sector:{stock['sector']})" 
@@ -156,6 +161,7 @@ def main():
                 tasks = create_tasks(agents, stock_data)
                 
                 # Create and run the crew
+                from crewai import Crew
                 crew = Crew(
                     agents=agents,
                     tasks=tasks,
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 16:52:26 2026
+
+Headless research over the S&P 500 universe (or some of its sectors):
+tickers are processed in shards, LLM calls are rate limited, progress is
+checkpointed so an interrupted run resumes where it stopped.
+
+    python batch_research.py --sector "Information Technology" --shard-size 5
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from stock_config import BATCH_LLM_BURST, BATCH_LLM_IN_FLIGHT
+from stock_correlation import RollingCorrelation, StockCorrelation
+from stock_executor import BACKENDS, AnalysisExecutor
+from stock_limits import CallLimiter
+from stock_llm_cache import ResponseCache
+from stock_llm_gateway import LLMGateway
+from stock_resources import StockResources
+from stock_results import ResultStore
+from stock_tracing import Tracer
+from stock_universe import StockUniverse
+from stock_utils import StockUtils
+
+
+class BatchResearchRunner:
+    # Shards used for the rolling throughput figure
+    THROUGHPUT_WINDOW = 10
+
+    def __init__(self, output_dir, period='1mo', shard_size=5, llm_per_minute=30,
+                 max_in_flight=2, use_llm=True, executor=None, llm_in_flight=BATCH_LLM_IN_FLIGHT,
+                 llm_burst=BATCH_LLM_BURST):
+        self.output_dir = Path(output_dir)
+        self.results_path = self.output_dir / 'results.jsonl'
+        self.checkpoint_path = self.output_dir / 'checkpoint.json'
+        self.period = period
+        self.shard_size = shard_size
+        self.max_in_flight = max_in_flight
+        self.use_llm = use_llm
+        self.executor = executor
+        # Shards run `max_in_flight` at a time; the LLM calls inside them are
+        # limited separately, per call, across all shards
+        self.llm_limiter = CallLimiter(llm_per_minute, llm_in_flight, llm_burst)
+        self.long_run = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def select_universe(sectors=None, limit=None):
+        """Yahoo symbols of all constituents, optionally restricted to some GICS sectors"""
+        table = StockUniverse.get_constituents()
+        if StockUniverse.is_partial():
+            print(f"Warning: Wikipedia is unreachable; using the bundled partial list "
+                  f"({len(table)} of ~500 constituents)")
+        if sectors:
+            unknown = set(sectors) - set(table['GICS Sector'])
+            if unknown:
+                raise ValueError(f"Unknown sector(s): {', '.join(sorted(unknown))}")
+            table = table[table['GICS Sector'].isin(sectors)]
+        tickers = [StockUniverse.yahoo_symbol(symbol) for symbol in table['Symbol']]
+        return tickers[:limit] if limit else tickers
+
+    def shard(self, tickers):
+        return [tickers[i:i + self.shard_size] for i in range(0, len(tickers), self.shard_size)]
+
+    def run(self, tickers, restart=False):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if restart:
+            self.checkpoint_path.unlink(missing_ok=True)
+            self.results_path.unlink(missing_ok=True)
+
+        done = self._load_checkpoint()
+        pending = [shard for shard in self.shard(tickers) if self._shard_key(shard) not in done]
+        print(f"{len(tickers)} tickers, {len(pending)} of {len(self.shard(tickers))} shards left "
+              f"(shard size {self.shard_size}, {self.max_in_flight} in flight)")
+        if not pending:
+            return
+
+        StockUtils.load_environment()
+        llm = StockResources.groq_llm() if self.use_llm else None
+        cache = ResponseCache()
+        store = ResultStore()
+        # Full-history correlations saved by earlier runs, added to each shard's prompt
+        universe = RollingCorrelation.load(self.universe_key(tickers))
+        self.long_run = universe.matrix() if universe.last_date is not None else None
+
+        started = time.monotonic()
+        recent = deque(maxlen=self.THROUGHPUT_WINDOW)
+        processed = 0
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='batch-shard') as executor:
+            futures = [executor.submit(self._run_shard, shard, llm, cache, store) for shard in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                self._save(record, done)
+
+                processed += len(record['tickers'])
+                recent.append((time.monotonic(), len(record['tickers'])))
+                elapsed = time.monotonic() - started
+                print(f"[{len(done)} shards done] {','.join(record['tickers'])}: "
+                      f"{len(record['summaries'])} ok, {len(record['errors'])} failed | "
+                      f"{processed / elapsed * 60:.1f} tickers/min overall, "
+                      f"{self._rolling_rate(recent, started):.1f} recent")
+
+        print(f"Finished {processed} tickers in {(time.monotonic() - started) / 60:.1f} min; "
+              f"results in {self.results_path}; LLM cache {cache.stats()}")
+        self.update_universe_correlation(tickers)
+
+    @staticmethod
+    def universe_key(tickers):
+        """The requested universe in a stable order, whatever loads"""
+        return sorted(dict.fromkeys(tickers))
+
+    @staticmethod
+    def update_universe_correlation(tickers):
+        """Fold the newest stored bars into the saved universe correlation matrix"""
+        history = StockUtils.price_store().get_history(tickers, 'max', refresh=False)
+        if history.empty:
+            return
+        returns = StockCorrelation.returns(history)
+        rolling = RollingCorrelation.load(BatchResearchRunner.universe_key(tickers)).update(returns)
+        rolling.save()
+        print(f"Universe correlation: {len(rolling.tickers)} tickers up to {rolling.last_date:%Y-%m-%d}")
+
+    def export_parquet(self):
+        """Write the JSONL results as a flat Parquet table, one row per ticker"""
+        # A shard retried on resume appears twice; its latest record wins
+        records = {}
+        with open(self.results_path, encoding='utf-8') as source:
+            for line in source:
+                record = json.loads(line)
+                records[self._shard_key(record['tickers'])] = record
+
+        rows = []
+        for record in records.values():
+            shared = {key: record[key] for key in ('period', 'market_analysis', 'trading_strategy', 'completed_at')}
+            for summary in record['summaries']:
+                row = {key: value for key, value in summary.items() if key != 'indicators'}
+                rows.append({**row, **summary['indicators'], **shared})
+            for ticker, error in record['errors'].items():
+                if ticker in record['tickers']:
+                    rows.append({'ticker': ticker, 'error': error, **shared})
+
+        path = self.results_path.with_suffix('.parquet')
+        pd.DataFrame(rows).to_parquet(path, index=False)
+        return path
+
+    def _run_shard(self, shard, llm, cache, store):
+        summaries, errors = StockUtils.collect_summaries(shard, self.period, executor=self.executor)
+        record = {
+            'tickers': shard,
+            'period': self.period,
+            'summaries': [summary.to_dict() for summary in summaries],
+            'errors': {ticker: str(error) for ticker, error in errors.items()},
+            'market_analysis': None,
+            'trading_strategy': None,
+            'run_id': None
+        }
+
+        if self.use_llm and summaries:
+            # The agent stack (crewai, langchain) is only loaded for LLM runs
+            from stock_agents import StockAgents
+            from stock_crew import StockCrew
+            from stock_tasks import StockTasks
+
+            agents = StockAgents.create_agents(llm)
+            try:
+                analysis = StockCorrelation.analyze(
+                    StockUtils.price_store(), [summary.ticker for summary in summaries], self.period
+                )
+                cross_stock = StockCorrelation.to_prompt(analysis, long_run=self.long_run)
+            except Exception as e:
+                record['errors']['correlation'] = str(e)
+                cross_stock = ""
+            tasks = StockTasks.create_tasks(agents, summaries, cross_stock=cross_stock)
+            tracer = Tracer()
+            try:
+                crew = StockCrew(
+                    agents, tasks, llm, cache=cache, process='parallel', gateway=LLMGateway.shared(),
+                    limiter=self.llm_limiter
+                )
+                with tracer.activate():
+                    results = crew.kickoff()
+                record['market_analysis'] = results.tasks_output[0].raw
+                record['trading_strategy'] = results.tasks_output[1].raw
+            except Exception as e:
+                record['errors']['llm'] = str(e)
+            else:
+                try:
+                    record['run_id'] = store.save(
+                        'batch', [summary.ticker for summary in summaries], self.period, summaries,
+                        ResultStore.crew_outputs(results, crew), model=StockResources.model_name(), tracer=tracer,
+                        inputs={'cross_stock': cross_stock}
+                    )
+                except Exception as e:
+                    # The answers are in results.jsonl; only the searchable copy is missing,
+                    # so the shard still counts as done
+                    record['errors']['persistence'] = str(e)
+
+        record['completed_at'] = datetime.now(timezone.utc).isoformat()
+        return record
+
+    def _save(self, record, done):
+        """Append the shard's results, then mark it done
+
+        A shard whose LLM run failed, or none of whose tickers could be
+        fetched (e.g. during a rate limit or outage), is retried on resume.
+        """
+        with self._lock:
+            with open(self.results_path, 'a', encoding='utf-8') as sink:
+                sink.write(json.dumps(record, default=str) + "\n")
+            if record['summaries'] and 'llm' not in record['errors']:
+                done.add(self._shard_key(record['tickers']))
+                tmp_path = self.checkpoint_path.with_suffix('.tmp')
+                tmp_path.write_text(json.dumps(sorted(done)))
+                tmp_path.replace(self.checkpoint_path)
+
+    def _load_checkpoint(self):
+        try:
+            return set(json.loads(self.checkpoint_path.read_text()))
+        except (OSError, ValueError):
+            return set()
+
+    @staticmethod
+    def _shard_key(shard):
+        return ",".join(shard)
+
+    @staticmethod
+    def _rolling_rate(recent, started):
+        """Tickers per minute over the last few shards"""
+        if len(recent) < 2:
+            return sum(count for _, count in recent) / max(time.monotonic() - started, 1e-9) * 60
+        span = recent[-1][0] - recent[0][0]
+        return sum(count for _, count in list(recent)[1:]) / max(span, 1e-9) * 60
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch AI research over S&P 500 constituents")
+    parser.add_argument('--sector', action='append', help="GICS sector to include (repeatable); default: all")
+    parser.add_argument('--limit', type=int, help="Only research the first N tickers")
+    parser.add_argument('--period', default='1mo', choices=['1mo', '3mo', '6mo'])
+    parser.add_argument('--shard-size', type=int, default=5, help="Tickers per crew run")
+    parser.add_argument('--llm-per-minute', type=float, default=30, help="Maximum LLM calls per minute")
+    parser.add_argument('--llm-in-flight', type=int, default=BATCH_LLM_IN_FLIGHT,
+                        help="Maximum LLM calls running at the same time")
+    parser.add_argument('--max-in-flight', type=int, default=2, help="Shards processed at the same time")
+    parser.add_argument('--output', default='batch_output', help="Folder for results.jsonl and the checkpoint")
+    parser.add_argument('--parquet', action='store_true', help="Also export the results as Parquet")
+    parser.add_argument('--no-llm', action='store_true', help="Only fetch data and indicators")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and start over")
+    parser.add_argument('--analytics', default='serial', choices=BACKENDS, help="Backend for per-ticker analytics")
+    parser.add_argument('--workers', type=int, help="Analytics workers; default: number of CPUs")
+    args = parser.parse_args()
+
+    with AnalysisExecutor(args.analytics, args.workers) as executor:
+        runner = BatchResearchRunner(
+            args.output,
+            period=args.period,
+            shard_size=args.shard_size,
+            llm_per_minute=args.llm_per_minute,
+            max_in_flight=args.max_in_flight,
+            llm_in_flight=args.llm_in_flight,
+            use_llm=not args.no_llm,
+            executor=executor
+        )
+        runner.run(runner.select_universe(args.sector, args.limit), restart=args.restart)
+    if args.parquet:
+        print(f"Parquet export: {runner.export_parquet()}")
+
+if __name__ == "__main__":
+    main()
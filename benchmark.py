@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 20:31:44 2026
+
+Offline benchmark of the research pipeline. Wikipedia, Yahoo and Groq are
+replaced by recorded responses (or deterministic synthetic ones when nothing
+was recorded), so runs are repeatable and comparable between versions.
+
+    python benchmark.py --sizes 3 50 500 --llm-latency 0.5 --output bench.json
+    python benchmark.py --baseline bench.json     # exit code 1 on regressions
+    python benchmark.py --record                  # capture live fixtures first
+"""
+
+import os
+import tempfile
+
+# Every cache the pipeline writes goes to a scratch folder; set before the
+# stock modules read their configuration
+os.environ['STOCK_CACHE_DIR'] = tempfile.mkdtemp(prefix='stock-bench-')
+os.environ.setdefault('LITELLM_LOCAL_MODEL_COST_MAP', 'True')
+os.environ.setdefault('CREWAI_DISABLE_TELEMETRY', 'true')
+os.environ.setdefault('OTEL_SDK_DISABLED', 'true')
+
+import argparse
+import functools
+import hashlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from crewai.llms.base_llm import BaseLLM
+
+import stock_utils
+from stock_agents import StockAgents
+from stock_config import CACHE_DIR, DATA_DIR, PRICE_STORE_PERIOD, SP500_URL
+from stock_correlation import StockCorrelation
+from stock_crew import StockCrew
+from stock_fundamentals import StockFundamentals
+from stock_prompts import StockPrompts
+from stock_resources import StockResources
+from stock_store import FIELDS, PriceStore
+from stock_tasks import StockTasks
+from stock_tracing import Tracer
+from stock_universe import StockUniverse
+from stock_utils import StockUtils
+
+FIXTURE_DIR = DATA_DIR / 'benchmark'
+HTML_FIXTURE = FIXTURE_DIR / 'sp500.html'
+PRICE_FIXTURES = FIXTURE_DIR / 'prices'
+
+# Synthetic data: a full-size index ending on a fixed day
+SYNTHETIC_CONSTITUENTS = 503
+SYNTHETIC_END = '2026-10-15'
+SYNTHETIC_DAYS = 5 * 252
+
+# Stages faster than this are too noisy to flag as regressions
+NOISE_FLOOR_SECONDS = 0.02
+
+
+class ReplayResponse:
+    def __init__(self, text):
+        self.text = text
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class ReplaySession:
+    """HTTP session that answers the constituent-table request from the HTML fixture"""
+
+    def __init__(self, html):
+        self.html = html
+        self.headers = {}
+
+    def get(self, url, **kwargs):
+        if url != SP500_URL:
+            raise ConnectionError(f"No recorded response for {url}")
+        return ReplayResponse(self.html)
+
+    def close(self):
+        pass
+
+
+class ReplayYahoo:
+    """Drop-in for StockUtils.download_history serving recorded or synthetic bars"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        # Fixtures are loaded once, like responses already in memory, so the
+        # timings measure the pipeline rather than the replay
+        self._bars = {}
+
+    def download(self, tickers, period='1mo', start=None):
+        self.requests += 1
+        time.sleep(self.latency)
+        frames = {}
+        for ticker in dict.fromkeys(tickers):
+            if ticker not in self._bars:
+                self._bars[ticker] = self.bars(ticker)
+            bars = self._bars[ticker]
+            frames[ticker] = bars[bars.index >= pd.Timestamp(start)] if start is not None else \
+                PriceStore.slice_period(bars, period)
+        if not frames:
+            return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=['Ticker', 'Price']))
+        return pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+
+    @staticmethod
+    def bars(ticker):
+        path = PRICE_FIXTURES / f"{ticker}.feather"
+        if path.exists():
+            return pd.read_feather(path).set_index('Date')
+        return ReplayYahoo.synthetic_bars(ticker)
+
+    @staticmethod
+    def synthetic_bars(ticker):
+        """Geometric random walk seeded by the ticker, so every run sees the same prices"""
+        rng = np.random.default_rng(int(hashlib.sha1(ticker.encode('utf-8')).hexdigest()[:8], 16))
+        dates = _synthetic_dates()
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.018, len(dates))))
+        open_ = close * (1 + rng.normal(0, 0.004, len(dates)))
+        spread = np.abs(rng.normal(0, 0.008, len(dates)))
+        return pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread),
+            'Low': np.minimum(open_, close) * (1 - spread),
+            'Close': close,
+            'Volume': rng.integers(1_000_000, 50_000_000, len(dates)).astype('float64')
+        }, index=dates)[FIELDS]
+
+
+@functools.lru_cache(maxsize=1)
+def _synthetic_dates():
+    return pd.bdate_range(end=SYNTHETIC_END, periods=SYNTHETIC_DAYS, name='Date')
+
+
+class StubLLM(BaseLLM):
+    """Deterministic LLM: sleeps `latency` seconds (plus generation time) and returns a fixed-shape answer"""
+
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    answer_tokens: int = 150
+
+    def call(self, messages, *args, **kwargs):
+        prompt = json.dumps(messages, default=str) if not isinstance(messages, str) else messages
+        generation = self.answer_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        time.sleep(self.latency + generation)
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]
+        words = " ".join(f"insight{i}" for i in range(self.answer_tokens))
+        return f"Final Answer: report {digest} {words}"
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return False
+
+    def get_context_window_size(self):
+        return 128000
+
+
+def synthetic_html():
+    """The bundled constituents padded with synthetic ones to a full-size index, as a Wikipedia-style table"""
+    table = pd.read_csv(StockUniverse.BUNDLED_PATH, dtype=str)
+    sectors = sorted(table['GICS Sector'].unique())
+    filler = pd.DataFrame({
+        'Symbol': [f"SYN{i:03d}" for i in range(SYNTHETIC_CONSTITUENTS - len(table))],
+        'Security': [f"Synthetic Co. {i}" for i in range(SYNTHETIC_CONSTITUENTS - len(table))],
+        'GICS Sector': [sectors[i % len(sectors)] for i in range(SYNTHETIC_CONSTITUENTS - len(table))],
+        'GICS Sub-Industry': "Synthetic"
+    })
+    return pd.concat([table, filler], ignore_index=True).to_html(index=False)
+
+
+def record():
+    """Capture the live constituent table and price histories as fixtures"""
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    PRICE_FIXTURES.mkdir(parents=True, exist_ok=True)
+    response = StockResources.http_session().get(SP500_URL, timeout=30)
+    response.raise_for_status()
+    HTML_FIXTURE.write_text(response.text, encoding='utf-8')
+
+    tickers = [StockUniverse.yahoo_symbol(symbol) for symbol in StockUniverse.refresh()['Symbol']]
+    for i in range(0, len(tickers), 100):
+        history = StockUtils.download_history(tickers[i:i + 100], PRICE_STORE_PERIOD)
+        for ticker in history.columns.get_level_values('Ticker').unique():
+            history[ticker].dropna(how='all').rename_axis('Date').reset_index().to_feather(
+                PRICE_FIXTURES / f"{ticker}.feather"
+            )
+    print(f"Recorded {len(tickers)} constituents to {FIXTURE_DIR}", file=sys.stderr)
+
+
+class PipelineBenchmark:
+    """Runs the Streamlit app's pipeline for the first N constituents and times every stage"""
+
+    def __init__(self, llm, yahoo, period='1mo'):
+        self.llm = llm
+        self.yahoo = yahoo
+        self.period = period
+        html = HTML_FIXTURE.read_text(encoding='utf-8') if HTML_FIXTURE.exists() else synthetic_html()
+        StockResources._session = ReplaySession(html)
+
+    def run(self, size, repeat=3, memory=True):
+        """Result rows for one universe size: median/min seconds per stage, peak memory, prompt tokens"""
+        samples = [self._measure(size) for _ in range(repeat)]
+        peaks = self._measure(size, trace_memory=True)['peak_mb'] if memory else {}
+
+        rows = []
+        for stage in samples[0]['seconds']:
+            seconds = [sample['seconds'][stage] for sample in samples if stage in sample['seconds']]
+            rows.append({
+                'size': size,
+                'stage': stage,
+                'seconds_median': round(statistics.median(seconds), 4),
+                'seconds_min': round(min(seconds), 4),
+                'peak_mb': peaks.get(stage),
+                'prompt_tokens': samples[0]['prompt_tokens'].get(stage)
+            })
+        return rows
+
+    def _measure(self, size, trace_memory=False):
+        self._reset()
+        tracer = Tracer()
+        sample = {'seconds': {}, 'peak_mb': {}, 'prompt_tokens': {}}
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            with tracer.activate():
+                with self._stage(sample, 'universe'):
+                    table = StockUniverse.refresh()
+                    tickers = [StockUniverse.yahoo_symbol(symbol) for symbol in table['Symbol']][:size]
+                with self._stage(sample, 'summaries_cold'):
+                    StockUtils.collect_summaries(tickers, self.period)
+                with self._stage(sample, 'summaries_warm'):
+                    summaries, _ = StockUtils.collect_summaries(tickers, self.period)
+                with self._stage(sample, 'correlation'):
+                    analysis = StockCorrelation.analyze(StockUtils.price_store(), tickers, self.period)
+                    cross_stock = StockCorrelation.to_prompt(analysis)
+                with self._stage(sample, 'tasks'):
+                    agents = StockAgents.create_agents(self.llm)
+                    tasks = StockTasks.create_tasks(agents, summaries, cross_stock=cross_stock)
+                sample['prompt_tokens']['tasks'] = sum(StockPrompts.estimate_tokens(task.description) for task in tasks)
+                with self._stage(sample, 'crew'):
+                    StockCrew(agents, tasks, self.llm, process='parallel').kickoff()
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        sample['seconds']['end_to_end'] = time.perf_counter() - started
+
+        # Nested spans (history, indicators, each LLM call, ...) as their own rows
+        for stage in tracer.breakdown():
+            sample['seconds'].setdefault(stage['stage'], stage['total_s'])
+        for call in tracer.llm_calls():
+            sample['prompt_tokens'][call['call']] = call.get('prompt_tokens')
+        return sample
+
+    @contextmanager
+    def _stage(self, sample, name):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        with Tracer.span(name):
+            yield
+        sample['seconds'][name] = time.perf_counter() - started
+        if tracemalloc.is_tracing():
+            sample['peak_mb'][name] = round((tracemalloc.get_traced_memory()[1] - baseline) / 2 ** 20, 2)
+
+    def _reset(self):
+        """Cold caches: a new price store, key statistics cache, constituent table and indicators"""
+        root = Path(tempfile.mkdtemp(dir=CACHE_DIR))
+        stock_utils._price_store = PriceStore(self.yahoo.download, root=root / 'prices')
+        stock_utils._fundamentals = StockFundamentals(root=root / 'fundamentals')
+        StockUniverse.clear_memo()
+        StockUtils.clear_indicator_cache()
+
+
+def compare(results, baseline, tolerance):
+    """Rows of (size, stage) that got slower than the baseline by more than `tolerance`"""
+    previous = {(row['size'], row['stage']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        before = previous.get((row['size'], row['stage']))
+        if before is None or before['seconds_median'] < NOISE_FLOOR_SECONDS:
+            continue
+        change = row['seconds_median'] / before['seconds_median'] - 1
+        if change > tolerance:
+            regressions.append({**row, 'baseline_seconds': before['seconds_median'], 'change_pct': round(change * 100, 1)})
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=DATA_DIR.parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the stock research pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 50, 500], help="Universe sizes to run")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per size; the median is reported")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="Seconds the stub LLM waits per call")
+    parser.add_argument('--llm-tokens-per-second', type=float, default=0.0,
+                        help="Stub generation speed; 0 returns the answer instantly after the latency")
+    parser.add_argument('--yahoo-latency', type=float, default=0.0, help="Seconds added to every price download")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the extra run that measures peak memory")
+    parser.add_argument('--output', help="Write the JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="Earlier JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown vs the baseline (0.2 = 20%%)")
+    parser.add_argument('--record', action='store_true', help="Capture live fixtures before benchmarking")
+    args = parser.parse_args()
+
+    if args.record:
+        record()
+
+    llm = StubLLM(model='stub', latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second)
+    benchmark = PipelineBenchmark(llm, ReplayYahoo(args.yahoo_latency))
+    results = []
+    for size in args.sizes:
+        rows = benchmark.run(size, args.repeat, memory=not args.no_memory)
+        results += rows
+        for row in rows:
+            print(f"{size:>5} {row['stage']:<36}{row['seconds_median']:>9.3f}s  "
+                  f"peak {row['peak_mb'] if row['peak_mb'] is not None else '-'} MB", file=sys.stderr)
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'fixtures': 'recorded' if HTML_FIXTURE.exists() else 'synthetic',
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline', 'record')},
+        'results': results
+    }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as source:
+            baseline = json.load(source)
+        for key in ('llm_latency', 'llm_tokens_per_second', 'yahoo_latency'):
+            if baseline['config'].get(key) != report['config'][key]:
+                print(f"Warning: baseline was run with {key}={baseline['config'].get(key)}", file=sys.stderr)
+        report['regressions'] = compare(results, baseline, args.tolerance)
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as sink:
+            sink.write(document)
+    else:
+        print(document)
+
+    for regression in report.get('regressions', []):
+        print(f"REGRESSION {regression['size']} {regression['stage']}: {regression['baseline_seconds']:.3f}s -> "
+              f"{regression['seconds_median']:.3f}s (+{regression['change_pct']}%)", file=sys.stderr)
+    return 1 if report.get('regressions') else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
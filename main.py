@@ -1,28 +1,195 @@
-import os
+import time
+import uuid
 import streamlit as st
-import litellm
-from crewai import Crew
-from langchain_groq import ChatGroq
 
-# Import custom classes
+# Import custom classes (these load pandas at startup); the LLM/agent stack
+# (crewai, langchain_groq, litellm) is imported when a research run first needs it
 from stock_utils import StockUtils
-from stock_agents import StockAgents
-from stock_tasks import StockTasks
+from stock_llm_cache import ResponseCache
+from stock_llm_gateway import LLMGateway
+from stock_resources import StockResources
+from stock_config import CACHE_DIR, LIVE_REFRESH_SECONDS, PREWARM_ENABLED, SCREENER_TOP_N
+from stock_live import LiveEngine
+from stock_prewarm import PrewarmScheduler, RequestTracker
+from stock_results import ResultStore
+from stock_screener import CRITERIA, StockScreener
+from stock_tracing import Tracer
+from stock_universe import StockUniverse
+
+@st.cache_resource
+def get_response_cache():
+    """One LLM response cache shared by every session of this process"""
+    return ResponseCache()
+
+@st.cache_resource
+def get_llm_gateway():
+    """LLM gateway shared by every session of this process: single-flight, batching, token budget"""
+    return LLMGateway.shared()
+
+@st.cache_resource
+def get_result_store():
+    """Saved research runs, shared by every session of this process"""
+    return ResultStore()
+
+@st.cache_resource
+def get_prewarm_scheduler():
+    """Background refresh of the most requested tickers after each close, one per process"""
+    scheduler = PrewarmScheduler(RequestTracker())
+    if PREWARM_ENABLED:
+        scheduler.start()
+    return scheduler
+
+# Live quote sources offered in the sidebar (stock_live.SOURCES)
+LIVE_SOURCES = {
+    'simulator': "Simulator",
+    'replay': "Replay of stored daily bars",
+    'chart': "1-minute chart bars"
+}
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_panel(source, symbols):
+    """Rolling indicators of the live engine, redrawn in place without rerunning the page"""
+    engine = LiveEngine.shared(source, symbols)
+    stats = engine.stats()
+    st.caption(
+        f"{stats['ticks_per_second']:,.0f} ticks/s, {stats['ticks']:,} ticks over {stats['symbols']} symbols"
+        + (f" (last error: {stats['error']})" if stats['error'] else "")
+    )
+    st.dataframe(engine.snapshot(symbols))
 
 class StockResearchApp:
     def __init__(self):
-        # Configure environment and LiteLLM
+        # Configure environment
         StockUtils.load_environment()
-        litellm.set_verbose = False
-        litellm.api_key = os.getenv("GROQ_API_KEY")
-
-    def initialize_groq_llm(self):
-        """Initialize Groq Language Model"""
-        return ChatGroq(
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            model="groq/llama-3.1-70b-versatile",
-            temperature=0.7
+
+    @staticmethod
+    def model_name():
+        return StockResources.model_name()
+
+    def get_llm(self):
+        """Groq client shared across runs; rebuilt when the API key or model changes"""
+        return StockResources.groq_llm()
+
+    @staticmethod
+    def session_client():
+        """This browser session's place in the gateway's fair queue"""
+        if '_llm_client' not in st.session_state:
+            st.session_state['_llm_client'] = uuid.uuid4().hex
+        return st.session_state['_llm_client']
+
+    @staticmethod
+    def stream_results(crew, boxes):
+        """Write each agent's tokens into its box as they arrive and track progress per agent"""
+        texts = [""] * len(boxes)
+        progress = st.progress(0.0, text=f"0/{len(boxes)} agents finished")
+        finished = 0
+        for event in crew.stream():
+            if event.done:
+                finished += 1
+                boxes[event.index].markdown(texts[event.index])
+                progress.progress(finished / len(boxes), text=f"{finished}/{len(boxes)} agents finished")
+            else:
+                texts[event.index] += event.text
+                boxes[event.index].markdown(texts[event.index] + " ▌")
+        progress.empty()
+        return crew.result
+
+    @staticmethod
+    def show_timings(tracer):
+        """Per-stage timing breakdown and LLM call details, plus a trace file for chrome://tracing"""
+        import pandas as pd
+        
+        with st.expander("⏱️ Timing Breakdown", expanded=True):
+            st.dataframe(pd.DataFrame(tracer.breakdown()), hide_index=True)
+            calls = pd.DataFrame(tracer.llm_calls())
+            if 'items' in calls:
+                # Calls list their tickers, batches count them; Arrow needs one type per column
+                calls['items'] = calls['items'].map(
+                    lambda items: ", ".join(items) if isinstance(items, list) else "" if pd.isna(items) else str(items)
+                )
+            st.dataframe(calls, hide_index=True)
+            path = tracer.export(CACHE_DIR / 'traces' / f"run-{time.strftime('%Y%m%d-%H%M%S')}.json")
+            st.caption(f"Chrome trace written to {path}")
+            st.download_button("Download trace", path.read_bytes(), file_name=path.name, mime="application/json")
+
+    @staticmethod
+    def cross_stock_analysis(tickers, period):
+        """Correlation and sector-relative prompt text; empty if the peers cannot be loaded"""
+        from stock_correlation import StockCorrelation
+        
+        try:
+            with Tracer.span('correlation', tickers=len(tickers)):
+                analysis = StockCorrelation.analyze(StockUtils.price_store(), tickers, period)
+            return StockCorrelation.to_prompt(analysis)
+        except Exception as e:
+            st.warning(f"Could not compute cross-stock analytics: {e}")
+            return ""
+
+    @staticmethod
+    def screen_universe(tickers, weights, top_n):
+        """Rank the whole index on price criteria, show the ranking and return the top names"""
+        symbols = [StockUniverse.yahoo_symbol(ticker) for ticker in tickers]
+        with Tracer.span('screen', tickers=len(symbols)):
+            # Sectors come from the constituent table, prices from the local store
+            sectors, _ = StockUtils.fundamentals().get_many(symbols, ['sector'])
+            ranking = StockScreener(weights).screen(
+                StockUtils.price_store(), symbols,
+                {ticker: values.get('sector', 'N/A') for ticker, values in sectors.items()}
+            )
+        st.header("🧮 Screener")
+        st.caption(f"{len(ranking)} of {len(symbols)} stocks ranked; the top {top_n} go to the agents")
+        st.dataframe(ranking.head(max(20, top_n)))
+        return StockScreener.top(ranking, top_n)
+
+    @staticmethod
+    def show_report(run):
+        """A saved run's agent outputs and stock figures, laid out like a fresh research run"""
+        st.header("🗂️ Saved Report")
+        st.caption(
+            f"Run #{run['id']} of {run['run_date']} ({run['period']}, {run['model']}): "
+            f"{run['prompt_tokens'] + run['completion_tokens']} tokens, {run['seconds']}s when it ran"
         )
+        crew_outputs = [output for output in run['outputs'] if output['ticker'] is None]
+        units = {output['ticker']: output['output'] for output in run['outputs'] if output['ticker']}
+        if crew_outputs:
+            for tab, output in zip(st.tabs([output['role'] for output in crew_outputs]), crew_outputs):
+                with tab:
+                    st.write(output['output'])
+        
+        st.header("📊 Stock Details")
+        for stock in run['stocks']:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric(f"{stock['ticker']} Price", f"${stock.get('current_price', 0)}")
+            with col2:
+                st.metric("Sector", stock.get('sector') or "N/A")
+            with col3:
+                st.metric("Price Change", f"{stock.get('price_change_pct', 0)}%")
+            if stock['ticker'] in units:
+                st.write(units[stock['ticker']])
+
+    @staticmethod
+    def search_history(store, tickers):
+        """Query form over every saved run's outputs"""
+        st.header("🔎 Past Reports")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            text = st.text_input("Words in the report")
+        with col2:
+            ticker = st.selectbox("Ticker", ["Any", *tickers])
+        with col3:
+            role = st.selectbox("Agent", ["Any", *store.roles()])
+        with col4:
+            sector = st.selectbox("Sector", ["Any", *sorted(StockUniverse.get_constituents()['GICS Sector'].unique())])
+        with col5:
+            since = st.selectbox("Since", ["Any", "1wk", "1mo", "3mo", "6mo", "1y"], index=3)
+        
+        any_to_none = lambda value: None if value == "Any" else value
+        results = store.search(
+            text, any_to_none(ticker), any_to_none(role), any_to_none(sector), any_to_none(since), limit=100
+        )
+        st.caption(f"{len(results)} matching outputs; load a run from the sidebar to see it in full")
+        st.dataframe(results, hide_index=True)
 
     def run(self):
         """Main Streamlit application"""
@@ -30,16 +197,39 @@ class StockResearchApp:
         
         st.title("🚀 Lean Stock Research Assistant")
         
+        # Starts the after-close refresh with the app, not with the first research run
+        get_prewarm_scheduler()
+        
+        # Spans of this run, shown when the timing breakdown is enabled
+        tracer = Tracer()
+        
         # Fetch S&P 500 tickers
-        sp500_tickers = StockUtils.get_sp500_tickers()
+        with tracer.activate():
+            sp500_tickers = StockUtils.get_sp500_tickers()
+        if StockUniverse.is_partial():
+            st.warning(
+                f"Wikipedia is unreachable, so only the {len(sp500_tickers)} largest S&P 500 constituents "
+                "bundled with the app are available (not the full index). The full list loads once it can be downloaded."
+            )
         
         # Sidebar for ticker selection
         st.sidebar.header("Stock Selection")
-        selected_tickers = st.sidebar.multiselect(
-            "Select up to 3 S&P 500 Stocks",
-            sp500_tickers,
-            max_selections=3
-        )
+        use_screener = st.sidebar.toggle("Screen the whole S&P 500", value=False)
+        if use_screener:
+            # The screener picks the tickers; only the best ranked reach the LLM
+            top_n = st.sidebar.slider("Top candidates sent to the agents", 1, 10, SCREENER_TOP_N)
+            with st.sidebar.expander("Screening weights"):
+                weights = {
+                    criterion: st.number_input(criterion.replace('_', ' ').capitalize(), value=weight, step=0.25)
+                    for criterion, weight in CRITERIA.items()
+                }
+            selected_tickers = []
+        else:
+            selected_tickers = st.sidebar.multiselect(
+                "Select up to 3 S&P 500 Stocks",
+                sp500_tickers,
+                max_selections=3
+            )
         
         # Period selection
         period = st.sidebar.selectbox(
@@ -48,35 +238,98 @@ class StockResearchApp:
             index=0
         )
         
+        # Live intraday indicators, fed by a background thread shared by all sessions
+        st.sidebar.header("Live Mode")
+        live = st.sidebar.toggle("Stream live indicators", value=False)
+        if live:
+            live_source = st.sidebar.selectbox("Quote source", list(LIVE_SOURCES), format_func=LIVE_SOURCES.get)
+            # Simulated and replayed ticks cover the whole index unless stocks are selected
+            live_symbols = [StockUniverse.yahoo_symbol(ticker) for ticker in selected_tickers or sp500_tickers]
+            st.header("📈 Live Indicators")
+            if live_source == 'chart' and not selected_tickers:
+                st.info("Select the stocks to poll for 1-minute bars.")
+            else:
+                live_panel(live_source, live_symbols)
+        
+        # Show the agents' answers as they are generated
+        stream_output = st.sidebar.checkbox("Stream agent output", value=True)
+        show_timings = st.sidebar.checkbox("Show timing breakdown", value=False)
+        research = st.sidebar.button("Perform AI Stock Research")
+        
+        # Saved reports: reopen one instead of paying for a new LLM run, or search them all
+        st.sidebar.header("Research History")
+        store = get_result_store()
+        saved = {run['id']: run for run in store.runs(limit=50)}
+        latest = store.latest(selected_tickers, period) if selected_tickers else None
+        report_id = None
+        if saved:
+            report_id = st.sidebar.selectbox(
+                "Saved reports", list(saved), index=list(saved).index(latest) if latest in saved else 0,
+                format_func=lambda run_id: f"#{run_id} {saved[run_id]['run_date']} "
+                                           f"{saved[run_id]['tickers']} ({saved[run_id]['period']})"
+            )
+            if latest is not None:
+                st.sidebar.caption("This selection was researched before; its report loads without an LLM call.")
+        load_report = st.sidebar.button("Load saved report", disabled=report_id is None)
+        search_history = st.sidebar.checkbox("Search past reports", value=False)
+        
+        if load_report:
+            self.show_report(store.load(report_id))
+        if search_history:
+            self.search_history(store, sp500_tickers)
+        
         # Research button
-        if st.sidebar.button("Perform AI Stock Research"):
-            if not selected_tickers:
+        if research:
+            if not use_screener and not selected_tickers:
                 st.error("Please select at least one stock!")
                 return
             
             # Show loading state
-            with st.spinner('Conducting AI stock research...'):
+            with st.spinner('Conducting AI stock research...'), tracer.activate():
                 try:
-                    # Initialize LLM
-                    llm = self.initialize_groq_llm()
+                    if use_screener:
+                        selected_tickers = self.screen_universe(sp500_tickers, weights, top_n)
+                        if not selected_tickers:
+                            st.error("No stock prices available to screen yet.")
+                            return
                     
-                    # Fetch and summarize stock data
-                    stock_data = [StockUtils.summarize_stock_data(ticker, period) for ticker in selected_tickers]
-                    stock_data = [data for data in stock_data if data is not None]
+                    # First run of this process pays for the agent stack here
+                    with Tracer.span('imports'):
+                        from stock_agents import StockAgents
+                        from stock_crew import StockCrew
+                        from stock_tasks import StockTasks
+                        from stock_units import StockAnalysisUnits
                     
-                    # Create agents and tasks
-                    agents = StockAgents.create_agents(llm)
-                    tasks = StockTasks.create_tasks(agents, stock_data)
+                    # Reuse the LLM client of earlier runs
+                    llm = self.get_llm()
                     
-                    # Create and run the crew
-                    crew = Crew(
-                        agents=agents,
-                        tasks=tasks,
-                        verbose=False
+                    # Count the request and whether its prices were already warm
+                    store = StockUtils.price_store()
+                    get_prewarm_scheduler().tracker.record(
+                        selected_tickers, period, [ticker for ticker in selected_tickers if store.is_fresh(ticker)]
                     )
                     
-                    # Kickoff the research
-                    results = crew.kickoff()
+                    # Fetch and summarize stock data
+                    stock_data = StockUtils.summarize_stocks(selected_tickers, period)
+                    cross_stock = self.cross_stock_analysis([stock.ticker for stock in stock_data], period)
+                    
+                    # Per-ticker analyses, reused across selections while the ticker's data is unchanged
+                    analysis_units = StockAnalysisUnits(
+                        llm, cache=get_response_cache(), gateway=get_llm_gateway(), client=self.session_client()
+                    )
+                    units = analysis_units.analyze(stock_data, period)
+                    
+                    # Reuse this session's agents and create tasks
+                    with Tracer.span('tasks'):
+                        agents = StockResources.get_agents(st.session_state, llm, StockAgents.create_agents)
+                        tasks = StockTasks.create_tasks(agents, stock_data, cross_stock=cross_stock, units=units)
+                    
+                    # Create and run the crew, reusing cached answers for identical prompts;
+                    # both tasks only read the stock summary, so they run side by side
+                    crew = StockCrew(
+                        agents, tasks, llm, cache=get_response_cache(), process='parallel',
+                        gateway=get_llm_gateway(), client=self.session_client()
+                    )
                     
                     # Display results
                     st.header("🔍 Research Insights")
@@ -89,27 +342,66 @@ class StockResearchApp:
                     
                     with tab1:
                         st.subheader("Market Trend Analysis")
-                        st.write(results.tasks_output[0].raw)
+                        market_box = st.empty()
                     
                     with tab2:
                         st.subheader("Trading Strategy")
-                        st.write(results.raw)
+                        strategy_box = st.empty()
+                    
+                    # Kickoff the research
+                    if stream_output:
+                        results = self.stream_results(crew, [market_box, strategy_box])
+                    else:
+                        results = crew.kickoff()
+                    
+                    market_box.write(results.tasks_output[0].raw)
+                    strategy_box.write(results.raw)
+                    with tab2:
                         st.write(results.tasks_output[0].description)
                         
                     # Display basic stock information
                     st.header("📊 Stock Details")
+                    st.caption(
+                        f"Per-stock analyses: {analysis_units.reused} reused, {analysis_units.generated} generated"
+                    )
                     for stock in stock_data:
                         col1, col2, col3 = st.columns(3)
                         with col1:
-                            st.metric(f"{stock['ticker']} Price", f"${stock['current_price']}")
+                            st.metric(f"{stock.ticker} Price", f"${stock.current_price}")
                         with col2:
-                            st.metric("Sector", stock['sector'])
+                            st.metric("Sector", stock.sector)
                         with col3:
-                            st.metric("Price Change", f"{stock['price_change_pct']}%")
+                            st.metric("Price Change", f"{stock.price_change_pct}%")
+                        st.write(units[stock.ticker])
+                    
+                    # Keep the run, so it can be reopened or searched without another LLM call
+                    get_result_store().save(
+                        'app', [stock.ticker for stock in stock_data], period, stock_data,
+                        ResultStore.crew_outputs(results, crew) + ResultStore.unit_outputs(units),
+                        model=self.model_name(), tracer=tracer,
+                        inputs={'screener': weights if use_screener else None, 'cross_stock': cross_stock}
+                    )
                 
                 except Exception as e:
                     st.error(f"Research error: {e}")
 
+            if show_timings:
+                self.show_timings(tracer)
+
+            stats = get_response_cache().stats()
+            st.sidebar.caption(
+                f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} stored"
+            )
+            gateway = get_llm_gateway().stats()
+            st.sidebar.caption(
+                f"LLM gateway: {gateway['calls']} calls, {gateway['deduplicated']} shared, "
+                f"{gateway['waited_s']}s waiting for the token budget"
+            )
+            warm = get_prewarm_scheduler().status()
+            st.sidebar.caption(
+                f"Warm price data: {warm['hit_rate']:.0%} of {warm['requests']} ticker requests"
+            )
+
 def main():
     app = StockResearchApp()
     app.run()
@@ -10,22 +10,27 @@ from langchain_groq import ChatGroq
 import os
 
 class StockAgents:
+    # Agent definitions, also used for prompts sent without crewai (see persona)
+    ANALYST = {
+        'role': "Technical indicator analyst",
+        'goal': "Provide ultra-concise market insights",
+        'backstory': "Expert in distilling complex market data using technical indicators and then decide trading strategy"
+    }
+    STRATEGIST = {
+        'role': "Trading Strategist",
+        'goal': "Craft minimal, high-impact trading recommendations",
+        'backstory': "Invest based on company profile and news about the company"
+    }
+
     @staticmethod
     def create_agents(llm):
         """Create AI agents for stock research"""
         return [
-            Agent(
-                role="Technical indicator analyst",
-                goal="Provide ultra-concise market insights",
-                backstory="Expert in distilling complex market data using technical indicators and then decide trading strategy",
-                llm=llm,
-                verbose=False
-            ),
-            Agent(
-                role="Trading Strategist",
-                goal="Craft minimal, high-impact trading recommendations",
-                backstory="Invest based on company profile and news about the company",
-                llm=llm,
-                verbose=False
-            )
-        ]
\ No newline at end of file
+            Agent(**StockAgents.ANALYST, llm=llm, verbose=False),
+            Agent(**StockAgents.STRATEGIST, llm=llm, verbose=False)
+        ]
+
+    @staticmethod
+    def persona(definition):
+        """System prompt introducing an agent definition, as crewai opens its own"""
+        return f"You are {definition['role']}. {definition['backstory']}"
\ No newline at end of file
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 21:14:52 2026
+
+US equity session times, used to tell whether stored daily bars can still change
+"""
+
+from datetime import datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from stock_config import MARKET_SETTLE_SECONDS
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+
+class MarketCalendar:
+    """Regular NYSE/Nasdaq sessions on weekdays; exchange holidays are not modelled,
+    so a holiday simply looks like a session without new bars"""
+
+    @staticmethod
+    def now():
+        return datetime.now(timezone.utc)
+
+    @staticmethod
+    def is_open(now=None):
+        local = (now or MarketCalendar.now()).astimezone(MARKET_TIMEZONE)
+        return local.weekday() < 5 and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+    @staticmethod
+    def last_close(now=None):
+        """Most recent session close at or before `now` (UTC datetime)"""
+        local = (now or MarketCalendar.now()).astimezone(MARKET_TIMEZONE)
+        day = local.date()
+        if local.time() < MARKET_CLOSE:
+            day -= timedelta(days=1)
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        return datetime.combine(day, MARKET_CLOSE, MARKET_TIMEZONE).astimezone(timezone.utc)
+
+    @staticmethod
+    def next_close(now=None):
+        """First session close after `now` (UTC datetime)"""
+        local = (now or MarketCalendar.now()).astimezone(MARKET_TIMEZONE)
+        day = local.date()
+        if local.time() >= MARKET_CLOSE:
+            day += timedelta(days=1)
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        return datetime.combine(day, MARKET_CLOSE, MARKET_TIMEZONE).astimezone(timezone.utc)
+
+    @staticmethod
+    def settled_since(timestamp, now=None):
+        """True when `timestamp` (epoch seconds) lies after the last close plus the settle delay
+        and the market is still closed: daily bars fetched then cannot change before the next open"""
+        now = now or MarketCalendar.now()
+        if MarketCalendar.is_open(now):
+            return False
+        return timestamp >= MarketCalendar.last_close(now).timestamp() + MARKET_SETTLE_SECONDS
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 09:12:40 2026
+
+Shared settings for the stock research modules, read from the environment
+"""
+
+import os
+from pathlib import Path
+
+# Root folder for every local cache (ticker universe, price store, ...)
+CACHE_DIR = Path(os.getenv("STOCK_CACHE_DIR", "./cache"))
+
+# Files shipped with the repository
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# How long a downloaded S&P 500 constituent table is considered fresh
+SP500_TTL_SECONDS = int(os.getenv("SP500_TTL_SECONDS", str(24 * 60 * 60)))
+
+SP500_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+
+# Window downloaded the first time a ticker enters the local price store
+PRICE_STORE_PERIOD = os.getenv("PRICE_STORE_PERIOD", "2y")
+
+# Stored prices younger than this are served without asking Yahoo for new bars
+PRICE_REFRESH_SECONDS = int(os.getenv("PRICE_REFRESH_SECONDS", str(15 * 60)))
+
+# LLM response cache: how long an answer is reused and how many are kept
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))
+
+# Shared LLM gateway: provider token budget for the whole process, tokens held
+# back per call for the answer until its real size is known, and how long
+# per-ticker prompts wait for company before going out as one batch
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "20000"))
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", "400"))
+LLM_BATCH_WINDOW_SECONDS = float(os.getenv("LLM_BATCH_WINDOW_SECONDS", "0.05"))
+LLM_MAX_BATCH = int(os.getenv("LLM_MAX_BATCH", "8"))
+
+
+# Batch runner: LLM calls allowed back to back before the per-minute rate
+# applies, and LLM calls running at the same time across all shards
+BATCH_LLM_BURST = int(os.getenv("BATCH_LLM_BURST", "2"))
+BATCH_LLM_IN_FLIGHT = int(os.getenv("BATCH_LLM_IN_FLIGHT", "2"))
+
+# Key statistics cache: fields that practically never change (sector, name, ...)
+# and the ones that move daily (P/E, dividend yield, ...)
+FUNDAMENTALS_STATIC_TTL_SECONDS = int(os.getenv("FUNDAMENTALS_STATIC_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+FUNDAMENTALS_TTL_SECONDS = int(os.getenv("FUNDAMENTALS_TTL_SECONDS", str(24 * 60 * 60)))
+
+# Yahoo's daily bar is final this long after the close; bars fetched later
+# stay current until the next session opens
+MARKET_SETTLE_SECONDS = int(os.getenv("MARKET_SETTLE_SECONDS", str(15 * 60)))
+
+# Background pre-warming of the most requested tickers after the close
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "50"))
+PREWARM_BATCHES_PER_MINUTE = float(os.getenv("PREWARM_BATCHES_PER_MINUTE", "6"))
+# Weight of a request halves after this many days, so popularity follows current interest
+PREWARM_HALF_LIFE_DAYS = float(os.getenv("PREWARM_HALF_LIFE_DAYS", "7"))
+
+# Where daily prices come from: "async" (pooled, rate-limited chart API client)
+# or "yfinance" (yf.download)
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "async")
+# Chart API requests per second for the whole process, and in flight per host
+MARKET_DATA_REQUESTS_PER_SECOND = float(os.getenv("MARKET_DATA_REQUESTS_PER_SECOND", "10"))
+MARKET_DATA_PER_HOST = int(os.getenv("MARKET_DATA_PER_HOST", "8"))
+
+# Universe screener: candidates handed to the agents, and the return window it ranks on
+SCREENER_TOP_N = int(os.getenv("SCREENER_TOP_N", "3"))
+SCREENER_LOOKBACK_DAYS = int(os.getenv("SCREENER_LOOKBACK_DAYS", "63"))
+
+# Live mode: simulated ticks per second, how often the page redraws, how often
+# the chart source asks for new 1-minute bars, and how long an unwatched engine runs
+LIVE_TICKS_PER_SECOND = float(os.getenv("LIVE_TICKS_PER_SECOND", "2000"))
+LIVE_REFRESH_SECONDS = float(os.getenv("LIVE_REFRESH_SECONDS", "1"))
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "15"))
+LIVE_IDLE_SECONDS = float(os.getenv("LIVE_IDLE_SECONDS", "30"))
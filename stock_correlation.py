@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 18:25:31 2026
+
+Cross-stock analytics: pairwise correlations, betas and relative strength
+against equal-weight sector baskets, plus an incrementally updated
+correlation matrix for the whole universe
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from stock_config import CACHE_DIR
+from stock_store import PriceStore
+from stock_universe import StockUniverse
+
+
+class StockCorrelation:
+    @staticmethod
+    def returns(history):
+        """Daily simple returns of every ticker in a batch frame (dates x tickers)"""
+        close = history.xs('Close', axis=1, level='Price')
+        return close.pct_change(fill_method=None).iloc[1:]
+
+    @staticmethod
+    def sector_baskets(returns, sectors):
+        """Equal-weight daily return of each sector's tickers (dates x sectors)"""
+        by_sector = pd.Series(sectors).reindex(returns.columns)
+        return returns.T.groupby(by_sector).mean().T
+
+    @staticmethod
+    def cross_stock(returns, baskets, sectors):
+        """Pairwise correlations plus beta and relative strength of each ticker vs its sector basket
+
+        `returns` holds the selected tickers, `baskets` one column per sector and
+        `sectors` maps ticker -> sector. Everything is computed in one pass over
+        aligned (dates x tickers) matrices; each ticker uses the dates where it
+        and its own basket traded, so one ticker without a basket or with a
+        short history leaves the others' figures intact.
+        """
+        tickers = [ticker for ticker in returns.columns if sectors.get(ticker) in baskets.columns]
+        matched = baskets.reindex(columns=[sectors.get(ticker) for ticker in returns.columns])
+        matched.columns = returns.columns
+
+        valid = returns.notna().to_numpy() & matched.notna().to_numpy()
+        r = np.where(valid, returns.to_numpy(), 0.0)
+        b = np.where(valid, matched.to_numpy(), 0.0)
+        count = valid.sum(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r_centered = np.where(valid, r - r.sum(axis=0) / count, 0.0)
+            b_centered = np.where(valid, b - b.sum(axis=0) / count, 0.0)
+            beta = (r_centered * b_centered).sum(axis=0) / (b_centered ** 2).sum(axis=0)
+        relative_strength = (np.prod(1 + r, axis=0) - np.prod(1 + b, axis=0)) * 100
+
+        relative = pd.DataFrame({
+            'sector': [sectors.get(ticker) for ticker in returns.columns],
+            'beta': beta,
+            'relative_strength_pct': relative_strength
+        }, index=returns.columns)
+        relative.loc[~relative.index.isin(tickers) | (count < 2), ['beta', 'relative_strength_pct']] = np.nan
+
+        return {
+            # Pairwise-complete, like RollingCorrelation
+            'correlation': returns.corr(min_periods=2).round(2),
+            'relative': relative.round(2),
+            'observations': int(returns.notna().any(axis=1).sum())
+        }
+
+    @staticmethod
+    def analyze(store, tickers, period='1mo'):
+        """Cross-stock analytics for the selected tickers, using the constituent table for sectors
+
+        Sector peers are read through the price store, so after the first run
+        the baskets come from local files.
+        """
+        table = StockUniverse.get_constituents()
+        peers = table.assign(ticker=table['Symbol'].map(StockUniverse.yahoo_symbol))
+        sector_of = dict(zip(peers['ticker'], peers['GICS Sector']))
+        sectors = {ticker: sector_of[ticker] for ticker in tickers if ticker in sector_of}
+
+        basket_members = peers.loc[peers['GICS Sector'].isin(set(sectors.values())), 'ticker'].tolist()
+        history = PriceStore.slice_period(store.get_history(list(tickers) + basket_members, 'max'), period)
+        returns = StockCorrelation.returns(history)
+
+        members = [ticker for ticker in basket_members if ticker in returns.columns]
+        baskets = StockCorrelation.sector_baskets(returns[members], sector_of)
+        selected = [ticker for ticker in tickers if ticker in returns.columns]
+        return StockCorrelation.cross_stock(returns[selected], baskets, sectors)
+
+    @staticmethod
+    def to_prompt(analysis, max_items=10, long_run=None):
+        """One compact line each for correlations and sector-relative figures
+
+        Large selections keep only the `max_items` strongest correlations and
+        relative moves, so the text stays bounded however many tickers there are.
+        `long_run` is a full-history matrix (RollingCorrelation.matrix); its
+        pairs among the selected tickers are added as a third line.
+        """
+        pairs = StockCorrelation._strongest_pairs(analysis['correlation'], max_items)
+
+        relative = analysis['relative'].dropna(subset=['beta'])
+        relative = relative.loc[relative['relative_strength_pct'].abs().sort_values(ascending=False).index[:max_items]]
+        relative = [
+            f"{ticker} beta {row.beta:.2f} rs {row.relative_strength_pct:+.1f}% ({row.sector})"
+            for ticker, row in relative.iterrows()
+        ]
+        lines = [f"Daily return correlation ({analysis['observations']} days): " + (", ".join(pairs) or "n/a")]
+        lines.append("Vs equal-weight sector basket: " + ("; ".join(relative) or "n/a"))
+        if long_run is not None:
+            selected = [ticker for ticker in analysis['correlation'].columns if ticker in long_run.columns]
+            long_pairs = StockCorrelation._strongest_pairs(long_run.loc[selected, selected].round(2), max_items)
+            if long_pairs:
+                lines.append("Full-history correlation: " + ", ".join(long_pairs))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _strongest_pairs(corr, max_items):
+        """'A/B 0.87' for the `max_items` pairs of a correlation matrix with the largest |value|"""
+        upper = np.triu(np.ones(corr.shape, dtype=bool), k=1)
+        strongest = corr.where(upper).stack().dropna().sort_values(key=abs, ascending=False).head(max_items)
+        return [f"{a}/{b} {value:.2f}" for (a, b), value in strongest.items()]
+
+
+class RollingCorrelation:
+    """Pairwise-complete correlation matrix that absorbs new return rows in O(tickers^2)
+
+    Keeps, for every pair (i, j), the count of days both traded and the sums
+    of x_i, x_i^2 and x_i * x_j over those days. Adding a day is a rank-1
+    update; nothing is recomputed from the full history.
+    """
+
+    def __init__(self, tickers):
+        self.tickers = list(tickers)
+        size = len(self.tickers)
+        self.count = np.zeros((size, size))
+        self.sum_x = np.zeros((size, size))
+        self.sum_xx = np.zeros((size, size))
+        self.sum_xy = np.zeros((size, size))
+        self.last_date = None
+
+    def update(self, returns):
+        """Absorb the rows of a (dates x tickers) return frame dated after `last_date`"""
+        returns = returns.reindex(columns=self.tickers)
+        if self.last_date is not None:
+            returns = returns[returns.index > self.last_date]
+        if returns.empty:
+            return self
+
+        values = returns.to_numpy(dtype='float64')
+        mask = ~np.isnan(values)
+        x = np.where(mask, values, 0.0)
+        m = mask.astype('float64')
+        self.count += m.T @ m
+        self.sum_x += x.T @ m
+        self.sum_xx += (x ** 2).T @ m
+        self.sum_xy += x.T @ x
+        self.last_date = returns.index.max()
+        return self
+
+    def matrix(self, min_periods=20):
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = n * self.sum_xy - self.sum_x * self.sum_x.T
+            variance = (n * self.sum_xx - self.sum_x ** 2) * (n * self.sum_xx.T - self.sum_x.T ** 2)
+            corr = covariance / np.sqrt(variance)
+        corr[n < min_periods] = np.nan
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.tickers, columns=self.tickers)
+
+    @staticmethod
+    def path_for(tickers):
+        """State file of one requested universe, so sector runs don't overwrite the full one
+
+        Keyed by the tickers asked for, not by those that happened to have
+        prices, so a ticker failing to load does not start a new state file.
+        """
+        digest = hashlib.sha1(",".join(sorted(tickers)).encode('utf-8')).hexdigest()[:12]
+        return CACHE_DIR / f"correlation_{digest}.npz"
+
+    def save(self, path=None):
+        path = path or self.path_for(self.tickers)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path, tickers=np.array(self.tickers), count=self.count, sum_x=self.sum_x,
+            sum_xx=self.sum_xx, sum_xy=self.sum_xy,
+            last_date=np.array(str(self.last_date) if self.last_date is not None else "")
+        )
+
+    @classmethod
+    def load(cls, tickers, path=None):
+        """Saved state for exactly these tickers, or a fresh one if the universe changed
+
+        Tickers without prices stay in the state with no observations.
+        """
+        path = path or cls.path_for(list(tickers))
+        try:
+            state = np.load(path)
+        except OSError:
+            return cls(tickers)
+        if list(state['tickers']) != list(tickers):
+            return cls(tickers)
+
+        rolling = cls(tickers)
+        for name in ('count', 'sum_x', 'sum_xx', 'sum_xy'):
+            setattr(rolling, name, state[name])
+        last_date = str(state['last_date'])
+        rolling.last_date = pd.Timestamp(last_date) if last_date else None
+        return rolling
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 14:36:40 2026
+
+Runs crew tasks itself so LLM answers can be cached and independent tasks run in parallel
+"""
+
+import functools
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from crewai.crews.crew_output import CrewOutput
+from crewai.tasks.task_output import TaskOutput
+
+from stock_llm_cache import ResponseCache
+from stock_llm_gateway import LLMGateway
+from stock_prompts import StockPrompts
+from stock_tracing import Tracer
+
+# Separator crewai puts between earlier task outputs in a task's context
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+# Streamed piece of a task's answer; `done` marks the task's last event
+StreamEvent = namedtuple('StreamEvent', ['index', 'text', 'done'])
+
+
+class StockCrew:
+    """Drop-in replacement for `Crew(...).kickoff()` with response caching
+
+    process='sequential' mirrors crewai: every task sees the outputs of the
+    tasks before it. process='parallel' treats a task's `context` list as its
+    dependencies; tasks without one run concurrently on a thread pool.
+
+    With a `gateway` (LLMGateway), identical prompts already in flight in
+    other crews are shared and every call waits for the token budget in
+    `client`'s turn (e.g. one client per Streamlit session). With a `limiter`
+    (stock_limits.CallLimiter), every call actually sent to the LLM, not
+    answered from the cache or shared, takes one of its slots.
+    """
+
+    def __init__(self, agents, tasks, llm, cache=None, process='sequential', max_workers=4,
+                 gateway=None, client='default', limiter=None):
+        if process not in ('sequential', 'parallel'):
+            raise ValueError(f"Unknown process: {process}")
+        self.agents = agents
+        self.tasks = tasks
+        self.cache = cache
+        self.process = process
+        self.max_workers = max_workers
+        self.gateway = gateway
+        self.client = client
+        self.limiter = limiter
+        # id(task) -> id of the span its LLM call was traced on
+        self.span_ids = {}
+        self.llm = llm
+        self.model = getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or str(llm)
+        self.temperature = getattr(llm, 'temperature', None)
+
+    def kickoff(self):
+        return self._collect(self._run(self._execute))
+
+    def stream(self):
+        """Run the crew and yield StreamEvents as each agent's tokens arrive
+
+        Tasks are answered by calling the LLM's `stream()` directly with the
+        agent's persona, so text shows up before a task has finished. Once the
+        generator is exhausted the CrewOutput is available as `self.result`.
+        """
+        events = queue.Queue()
+        failure = []
+        self.result = None
+
+        def execute(task, context):
+            index = self.tasks.index(task)
+            output = self._execute_streaming(task, context, lambda text: events.put(StreamEvent(index, text, False)))
+            events.put(StreamEvent(index, "", True))
+            return output
+
+        def run():
+            try:
+                self.result = self._collect(self._run(execute))
+            except Exception as e:
+                failure.append(e)
+            finally:
+                events.put(None)
+
+        threading.Thread(target=Tracer.bind(run), name='stock-crew-stream', daemon=True).start()
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield event
+        if failure:
+            raise failure[0]
+
+    def _collect(self, outputs):
+        tasks_output = [outputs[id(task)] for task in self.tasks]
+        return CrewOutput(raw=tasks_output[-1].raw, tasks_output=tasks_output)
+
+    def _run(self, execute):
+        if self.process == 'parallel':
+            return self._run_parallel(execute)
+
+        outputs = {}
+        for task in self.tasks:
+            context = self._context(task, [outputs[id(done)] for done in self.tasks if id(done) in outputs])
+            outputs[id(task)] = execute(task, context)
+        return outputs
+
+    def _run_parallel(self, execute):
+        """Run every task as soon as the tasks in its `context` list have finished"""
+        dependencies = {id(task): self._dependencies(task) for task in self.tasks}
+        outputs, running = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stock-crew') as executor:
+            while len(outputs) < len(self.tasks):
+                for task in self.tasks:
+                    if (id(task) not in outputs and id(task) not in running.values()
+                            and all(dependency in outputs for dependency in dependencies[id(task)])):
+                        future = executor.submit(Tracer.bind(execute), task, self._context(task, []))
+                        running[future] = id(task)
+                if not running:
+                    raise ValueError("Task dependencies form a cycle or point outside this crew")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # Re-raises the task's exception, like a failing Crew.kickoff()
+                    outputs[running.pop(future)] = future.result()
+        return outputs
+
+    @staticmethod
+    def _dependencies(task):
+        context = getattr(task, 'context', None)
+        return [id(dependency) for dependency in context] if isinstance(context, list) else []
+
+    def _context(self, task, previous_outputs):
+        """Same context crewai's sequential process gives: explicit `context` tasks, else all earlier ones"""
+        context = getattr(task, 'context', None)
+        if isinstance(context, list):
+            previous_outputs = [task.output for task in context if task.output is not None]
+        return CONTEXT_DIVIDER.join(output.raw for output in previous_outputs)
+
+    def _execute(self, task, context):
+        with Tracer.span(f"llm:{task.agent.role}") as span:
+            key, cached = self._lookup(task, context)
+            if cached is not None:
+                self._trace_call(span, task, context, cached, cached=True)
+                return self._task_output(task, cached)
+
+            raw, sent = self._through_gateway(
+                key, task, context, lambda: task.execute_sync(agent=task.agent, context=context or None).raw
+            )
+            self._trace_call(span, task, context, raw, shared=not sent)
+            if self.cache is not None:
+                self.cache.set(key, raw)
+            # A crew that only shared another crew's call has no output of its own yet
+            return task.output if task.output is not None else self._task_output(task, raw)
+
+    def _execute_streaming(self, task, context, on_text):
+        started = time.perf_counter()
+        with Tracer.span(f"llm:{task.agent.role}") as span:
+            key, cached = self._lookup(task, context)
+            if cached is not None:
+                self._trace_call(span, task, context, cached, cached=True)
+                on_text(cached)
+                return self._task_output(task, cached)
+
+            parts, usage = [], []
+
+            def stream():
+                for chunk in LLMGateway.direct(self.llm).stream(self._messages(task, context)):
+                    text = getattr(chunk, 'content', chunk)
+                    # Providers that report usage attach it to one of the chunks
+                    if getattr(chunk, 'usage_metadata', None):
+                        usage.append(chunk.usage_metadata)
+                    if text:
+                        if not parts:
+                            span.set(first_token_s=round(time.perf_counter() - started, 3))
+                        parts.append(text)
+                        on_text(text)
+                return "".join(parts)
+
+            raw, sent = self._through_gateway(key, task, context, stream)
+            if not sent:
+                # Answered by another crew's identical call: show the text in one piece
+                on_text(raw)
+            self._trace_call(span, task, context, raw, shared=not sent, usage=usage[-1] if usage else None)
+            if self.cache is not None:
+                self.cache.set(key, raw)
+            return self._task_output(task, raw)
+
+    def _through_gateway(self, key, task, context, produce):
+        """`produce()`'s answer via the gateway when there is one, and whether this crew sent the request
+
+        False means the gateway handed back another crew's in-flight answer.
+        """
+        sent = []
+
+        def send():
+            sent.append(True)
+            return produce()
+
+        call = send if self.limiter is None else functools.partial(self.limiter.call, send)
+        if self.gateway is None:
+            return call(), True
+        prompt = "\n\n".join(text for _, text in self._messages(task, context))
+        raw = self.gateway.call(key, call, StockPrompts.estimate_tokens(prompt), self.client)
+        return raw, bool(sent)
+
+    def _trace_call(self, span, task, context, raw, cached=False, shared=False, usage=None):
+        """Prompt/response sizes and token counts of one LLM call on its span"""
+        self.span_ids[id(task)] = span.span_id
+        prompt = "\n\n".join(text for _, text in self._messages(task, context))
+        span.set(cached=cached, prompt_chars=len(prompt), response_chars=len(raw))
+        if shared:
+            span.set(shared=True)
+        if cached or shared:
+            # Answered from the cache or another crew's call: this crew spent no tokens
+            return
+        if usage:
+            span.set(prompt_tokens=usage.get('input_tokens', 0),
+                     completion_tokens=usage.get('output_tokens', 0), token_counts='provider')
+        else:
+            span.set(prompt_tokens=StockPrompts.estimate_tokens(prompt),
+                     completion_tokens=StockPrompts.estimate_tokens(raw), token_counts='estimate')
+
+    def _lookup(self, task, context):
+        """Key of a task's prompt plus its cached answer, if any"""
+        prompt = "\n\n".join([task.description, task.expected_output or "", context])
+        key = ResponseCache.make_key(self.model, self.temperature, task.agent.role, prompt)
+        return key, self.cache.get(key) if self.cache is not None else None
+
+    @staticmethod
+    def _task_output(task, raw):
+        task.output = TaskOutput(
+            description=task.description,
+            expected_output=task.expected_output,
+            raw=raw,
+            agent=task.agent.role
+        )
+        return task.output
+
+    @staticmethod
+    def _messages(task, context):
+        """Chat messages equivalent to the prompt a crewai agent builds for a task"""
+        agent = task.agent
+        system = f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"
+        user = f"Current Task: {task.description}\n\nThis is the expected criteria for your final answer: {task.expected_output}"
+        if context:
+            user += f"\n\nThis is the context you're working with:\n{context}"
+        return [("system", system), ("human", user)]
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 17:40:55 2026
+
+Pluggable executor for per-ticker analytics: serial, thread or process backend.
+The process backend hands price arrays to its workers through shared memory
+instead of pickling DataFrames.
+"""
+
+import os
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+BACKENDS = ('serial', 'thread', 'process')
+
+# Shared-memory block the current worker process is attached to
+_worker_block = {}
+
+
+def _attach(name, shape, dtype):
+    """Map the parent's shared block into this worker, once per block"""
+    if _worker_block.get('name') != name:
+        if 'shm' in _worker_block:
+            _worker_block['shm'].close()
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_block.update(name=name, shm=shm, array=np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    return _worker_block['array']
+
+
+def _run_rows(name, shape, dtype, func, rows):
+    array = _attach(name, shape, dtype)
+    return [func(array[row]) for row in rows]
+
+
+def _run_block(name, shape, dtype, func, start, stop, labels):
+    return func(_attach(name, shape, dtype)[start:stop], labels)
+
+
+class AnalysisExecutor:
+    """Apply analytics to every ticker's row of a price array, row by row or in blocks of rows"""
+
+    def __init__(self, backend='serial', max_workers=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}; expected one of {', '.join(BACKENDS)}")
+        self.backend = backend
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+
+    def map_rows(self, func, matrix, labels):
+        """{label: func(matrix[i])} for a (tickers x dates) float matrix
+
+        With the process backend `func` must be a picklable module-level function.
+        """
+        matrix = np.ascontiguousarray(matrix, dtype='float64')
+        if self.backend == 'serial' or len(labels) < 2:
+            return dict(zip(labels, (func(row) for row in matrix)))
+        if self.backend == 'thread':
+            return dict(zip(labels, self._get_pool().map(func, matrix)))
+        return dict(zip(labels, self._map_shared(func, matrix)))
+
+    def map_blocks(self, func, array, labels):
+        """[func(array[start:stop], labels[start:stop]), ...] over one block of rows per worker
+
+        For vectorized analytics whose per-call overhead would swamp single
+        rows; `array` may have more dimensions after the row axis. With the
+        process backend `func` must be picklable.
+        """
+        array = np.ascontiguousarray(array, dtype='float64')
+        labels = list(labels)
+        if self.backend == 'serial' or len(labels) < 2:
+            return [func(array, labels)]
+        bounds = np.linspace(0, len(labels), min(len(labels), self.max_workers) + 1).astype(int).tolist()
+        blocks = list(zip(bounds[:-1], bounds[1:]))
+        if self.backend == 'thread':
+            futures = [self._get_pool().submit(func, array[start:stop], labels[start:stop]) for start, stop in blocks]
+            return [future.result() for future in futures]
+        with self._shared(array) as name:
+            futures = [
+                self._get_pool().submit(_run_block, name, array.shape, array.dtype.str, func,
+                                        start, stop, labels[start:stop])
+                for start, stop in blocks
+            ]
+            return [future.result() for future in futures]
+
+    def _map_shared(self, func, matrix):
+        with self._shared(matrix) as name:
+            # A few chunks per worker keeps them busy without per-row overhead
+            chunks = np.array_split(np.arange(len(matrix)), min(len(matrix), self.max_workers * 4))
+            futures = [
+                self._get_pool().submit(_run_rows, name, matrix.shape, matrix.dtype.str, func, chunk.tolist())
+                for chunk in chunks
+            ]
+            return [result for future in futures for result in future.result()]
+
+    @staticmethod
+    @contextmanager
+    def _shared(array):
+        """Name of a shared-memory copy of `array`, unlinked on exit"""
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        try:
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+            yield shm.name
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _get_pool(self):
+        if self._pool is None:
+            pool_class = ProcessPoolExecutor if self.backend == 'process' else ThreadPoolExecutor
+            self._pool = pool_class(max_workers=self.max_workers)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 10:02:31 2026
+
+Bounded thread-pool engine for running per-ticker fetches concurrently
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class FetchResult:
+    """Per-ticker outcome of a concurrent fetch: successes in `data`, failures in `errors`"""
+
+    def __init__(self, tickers):
+        self.tickers = list(dict.fromkeys(tickers))
+        self.data = {}
+        self.errors = {}
+
+    def values(self):
+        """Successful results in the order the tickers were requested"""
+        return [self.data[ticker] for ticker in self.tickers if ticker in self.data]
+
+    def items(self):
+        """(ticker, result) pairs of the successes in the order the tickers were requested"""
+        return [(ticker, self.data[ticker]) for ticker in self.tickers if ticker in self.data]
+
+
+class StockFetcher:
+    """Run `func(ticker, ...)` for many tickers on a bounded thread pool"""
+
+    # How often the engine wakes up to check per-ticker deadlines
+    POLL_SECONDS = 0.25
+
+    def __init__(self, max_workers=8, timeout=30):
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def fetch(self, tickers, func, *args, **kwargs):
+        """Fetch every ticker concurrently and return a FetchResult with partial results
+
+        The timeout applies to each ticker from the moment a worker picks it up,
+        so tickers waiting for a free worker are never timed out early.
+        """
+        result = FetchResult(tickers)
+        if not result.tickers:
+            return result
+
+        started = {}
+
+        def run(ticker):
+            started[ticker] = time.monotonic()
+            return func(ticker, *args, **kwargs)
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, len(result.tickers))),
+            thread_name_prefix='stock-fetch'
+        )
+        futures = {executor.submit(run, ticker): ticker for ticker in result.tickers}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=self.POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ticker = futures[future]
+                    try:
+                        result.data[ticker] = future.result()
+                    except Exception as e:
+                        result.errors[ticker] = e
+
+                now = time.monotonic()
+                for future in list(pending):
+                    ticker = futures[future]
+                    if ticker in started and now - started[ticker] > self.timeout:
+                        # The worker thread cannot be interrupted; its result is discarded
+                        pending.discard(future)
+                        result.errors[ticker] = TimeoutError(f"timed out after {self.timeout}s")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return result
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 19:02:17 2026
+
+Field-selective key statistics: each requested field is served from the
+cheapest source that has it, and yfinance's full `info` payload is only
+downloaded when a field is not available anywhere else
+"""
+
+import json
+import threading
+import time
+
+from stock_config import (CACHE_DIR, FUNDAMENTALS_STATIC_TTL_SECONDS, FUNDAMENTALS_TTL_SECONDS,
+                          PRICE_REFRESH_SECONDS)
+from stock_fetch import StockFetcher
+from stock_resources import StockResources
+from stock_tracing import Tracer
+from stock_universe import StockUniverse
+
+# Fields that practically never change; cached for weeks
+STATIC_FIELDS = {
+    'sector', 'industry', 'longName', 'shortName', 'country', 'currency',
+    'exchange', 'quoteType', 'website', 'longBusinessSummary'
+}
+
+# Fields the lightweight quote endpoint (`fast_info`) provides, with its key names
+QUOTE_FIELDS = {
+    'currentPrice': 'lastPrice',
+    'previousClose': 'previousClose',
+    'marketCap': 'marketCap',
+    'fiftyTwoWeekHigh': 'yearHigh',
+    'fiftyTwoWeekLow': 'yearLow',
+    'currency': 'currency',
+    'exchange': 'exchange'
+}
+
+
+class StockFundamentals:
+    """Key statistics by field, in order of cost:
+
+    1. `currentPrice` from the last bar of a history frame the caller already has
+    2. `sector` from the cached S&P 500 constituent table
+    3. values cached on disk, with a TTL depending on how often the field changes
+    4. the quote endpoint for price-like fields
+    5. the full `info` payload for everything else
+    """
+
+    def __init__(self, root=None, static_ttl=FUNDAMENTALS_STATIC_TTL_SECONDS,
+                 ttl=FUNDAMENTALS_TTL_SECONDS, quote_ttl=PRICE_REFRESH_SECONDS):
+        self.root = root or CACHE_DIR / 'fundamentals'
+        self.static_ttl = static_ttl
+        self.ttl = ttl
+        self.quote_ttl = quote_ttl
+        # Number of fields served by each source, for inspection
+        self.sources = {'history': 0, 'universe': 0, 'cache': 0, 'quote': 0, 'info': 0}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker, fields, history=None):
+        """{field: value} for the fields that could be found; `history` is an optional batch frame"""
+        values = self._local(ticker, fields, self._last_closes(history), self._sector_map())
+        missing = [field for field in fields if field not in values]
+        if missing:
+            values.update(self._remote(ticker, missing))
+        return self._found(values)
+
+    def get_many(self, tickers, fields, history=None, max_workers=8, timeout=30):
+        """(ticker -> values, ticker -> error); only tickers with fields left after the local sources touch the network"""
+        closes, sectors = self._last_closes(history), self._sector_map()
+        data = {ticker: self._local(ticker, fields, closes, sectors) for ticker in dict.fromkeys(tickers)}
+
+        remote = {
+            ticker: [field for field in fields if field not in values]
+            for ticker, values in data.items() if len(values) < len(fields)
+        }
+        result = StockFetcher(max_workers=max_workers, timeout=timeout).fetch(
+            list(remote), Tracer.bind(lambda ticker: self._remote(ticker, remote[ticker]))
+        )
+        for ticker, values in result.data.items():
+            data[ticker].update(values)
+        return {ticker: self._found(values) for ticker, values in data.items()}, result.errors
+
+    def _local(self, ticker, fields, closes, sectors):
+        """Values known without a request; None marks a field Yahoo is known not to have"""
+        values = {}
+        entries = self._cached(ticker)
+        now = time.time()
+        for field in fields:
+            if field == 'currentPrice' and ticker in closes:
+                values[field] = closes[ticker]
+                self._count('history')
+            elif field == 'sector' and ticker in sectors:
+                values[field] = sectors[ticker]
+                self._count('universe')
+            elif field in entries and now - entries[field][1] < self._ttl(field):
+                values[field] = entries[field][0]
+                self._count('cache')
+        return values
+
+    def _remote(self, ticker, fields):
+        with Tracer.span('info_request', ticker=ticker, fields=len(fields)):
+            return self._download(ticker, fields)
+
+    def _download(self, ticker, fields):
+        # Imported on the first network lookup; most fields are served locally
+        import yfinance as yf
+
+        stock = yf.Ticker(ticker, session=StockResources.http_session())
+        values = {}
+        for field in fields:
+            if field in QUOTE_FIELDS:
+                try:
+                    value = stock.fast_info[QUOTE_FIELDS[field]]
+                except Exception:
+                    # Left for `info`, which reports the real error if it fails too
+                    continue
+                if value is not None:
+                    values[field] = self._plain(value)
+                    self._count('quote')
+
+        fetched = dict(values)
+        rest = [field for field in fields if field not in values]
+        if rest:
+            info = stock.info
+            # Fields `info` lacks are cached as None so they don't trigger the download again
+            values.update({field: info.get(field) for field in rest})
+            self._count('info', len(rest))
+            # The payload is already here, so keep its static fields for later requests
+            fetched.update({field: info[field] for field in STATIC_FIELDS if info.get(field) is not None})
+            fetched.update({field: info.get(field) for field in rest})
+        self._save(ticker, fetched)
+        return values
+
+    def _ttl(self, field):
+        if field in STATIC_FIELDS:
+            return self.static_ttl
+        if field in QUOTE_FIELDS:
+            return self.quote_ttl
+        return self.ttl
+
+    def _cached(self, ticker):
+        with self._lock:
+            if ticker not in self._entries:
+                try:
+                    self._entries[ticker] = json.loads(self._path(ticker).read_text(encoding='utf-8'))
+                except (OSError, ValueError):
+                    self._entries[ticker] = {}
+            return dict(self._entries[ticker])
+
+    def _save(self, ticker, values):
+        if not values:
+            return
+        now = time.time()
+        with self._lock:
+            entries = self._entries.setdefault(ticker, {})
+            entries.update({field: [self._plain(value), now] for field, value in values.items()})
+            path = self._path(ticker)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(entries), encoding='utf-8')
+            tmp_path.replace(path)
+
+    def _count(self, source, count=1):
+        with self._lock:
+            self.sources[source] += count
+
+    def _path(self, ticker):
+        return self.root / f"{ticker}.json"
+
+    @staticmethod
+    def _found(values):
+        return {field: value for field, value in values.items() if value is not None}
+
+    @staticmethod
+    def _plain(value):
+        # numpy scalars from fast_info are not JSON serializable
+        return value.item() if hasattr(value, 'item') else value
+
+    @staticmethod
+    def _last_closes(history):
+        """ticker -> last close of a batch frame keyed by (ticker, field)"""
+        if history is None or history.empty:
+            return {}
+        close = history.xs('Close', axis=1, level='Price').ffill().iloc[-1].dropna()
+        return close.astype(float).to_dict()
+
+    @staticmethod
+    def _sector_map():
+        """Yahoo symbol -> GICS sector from the constituent table; empty if it cannot be loaded"""
+        try:
+            table = StockUniverse.get_constituents()
+        except Exception:
+            return {}
+        return dict(zip(table['Symbol'].map(StockUniverse.yahoo_symbol), table['GICS Sector']))
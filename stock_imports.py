@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 00:12:40 2026
+
+Import-time report: cold import cost of the entry modules and of the stacks
+they defer until a research run, measured in fresh interpreters with
+`python -X importtime`, plus a history file to track startup cost over time
+
+    python stock_imports.py             # report
+    python stock_imports.py --record    # report and append it to the history
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from stock_config import CACHE_DIR
+
+# What a user waits for before the first page or prompt
+ENTRY_MODULES = ('main', 'app', 'appv1')
+# Imported by the entry modules only when a run needs them
+DEFERRED_MODULES = ('stock_crew', 'stock_agents', 'stock_market_data', 'yfinance')
+
+HISTORY_PATH = CACHE_DIR / 'import_times.jsonl'
+
+
+class ImportProfiler:
+    """Cold import timings of modules of this repository"""
+
+    @staticmethod
+    def measure(module, repeat=3, top=5):
+        """Fastest of `repeat` cold imports of `module`, with the packages that cost the most"""
+        runs = [ImportProfiler._import_once(module) for _ in range(repeat)]
+        total, packages = min(runs, key=lambda run: run[0])
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            'module': module,
+            'seconds': round(total, 3),
+            'heaviest': {package: round(seconds, 3) for package, seconds in heaviest}
+        }
+
+    @staticmethod
+    def _import_once(module):
+        """(total seconds, {top-level package: seconds of its own import work})"""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=Path(__file__).resolve().parent, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+
+        total, packages = 0.0, {}
+        for line in result.stderr.splitlines():
+            # "import time:  self [us] | cumulative | imported package"
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            package = name.strip().split('.')[0]
+            packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+            if name.strip() == module:
+                total = int(cumulative_us) / 1e6
+        return total, packages
+
+    @staticmethod
+    def report(modules=ENTRY_MODULES + DEFERRED_MODULES, repeat=3):
+        return [ImportProfiler.measure(module, repeat) for module in modules]
+
+    @staticmethod
+    def record(rows, path=HISTORY_PATH):
+        """Append one timestamped report to the history"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'modules': {row['module']: row['seconds'] for row in rows}
+        }
+        with open(path, 'a', encoding='utf-8') as history:
+            history.write(json.dumps(entry) + "\n")
+
+    @staticmethod
+    def last_recorded(path=HISTORY_PATH):
+        """Module -> seconds of the newest report in the history, or {}"""
+        if not path.exists():
+            return {}
+        lines = path.read_text(encoding='utf-8').splitlines()
+        return json.loads(lines[-1])['modules'] if lines else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of the entry modules and deferred stacks")
+    parser.add_argument('modules', nargs='*', help="Modules to measure (default: entry and deferred modules)")
+    parser.add_argument('--repeat', type=int, default=3, help="Imports per module; the fastest counts")
+    parser.add_argument('--record', action='store_true', help=f"Append the report to {HISTORY_PATH}")
+    args = parser.parse_args()
+
+    previous = ImportProfiler.last_recorded()
+    rows = ImportProfiler.report(args.modules or ENTRY_MODULES + DEFERRED_MODULES, args.repeat)
+    print(f"{'module':<20}{'seconds':>9}{'change':>9}  heaviest packages")
+    for row in rows:
+        change = f"{row['seconds'] - previous[row['module']]:+.3f}" if row['module'] in previous else ""
+        heaviest = ", ".join(f"{package} {seconds:.2f}" for package, seconds in row['heaviest'].items())
+        print(f"{row['module']:<20}{row['seconds']:>9.3f}{change:>9}  {heaviest}")
+
+    if args.record:
+        ImportProfiler.record(rows)
+        print(f"Recorded in {HISTORY_PATH}")
+
+if __name__ == "__main__":
+    main()
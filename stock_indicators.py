@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 12:04:17 2026
+
+Vectorized technical indicators computed for all tickers at once
+"""
+
+import functools
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# Rows needed by the longest rolling window used in snapshot()
+SNAPSHOT_TAIL = 21
+
+# Price fields snapshot() reads
+SNAPSHOT_FIELDS = ['High', 'Low', 'Close']
+
+
+class StockIndicators:
+    """Indicator kernels over wide frames (rows are dates, columns are tickers)"""
+
+    @staticmethod
+    def ema(close, span):
+        return close.ewm(span=span, adjust=False, min_periods=span).mean()
+
+    @staticmethod
+    def rsi(close, window=14):
+        """Wilder's relative strength index"""
+        delta = close.diff()
+        gain = delta.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+        loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+        rsi = 100 - 100 / (1 + gain / loss)
+        # No losses in the window means RSI 100, not NaN
+        return rsi.where(loss != 0, 100.0).where(gain.notna())
+
+    @staticmethod
+    def bollinger(close, window=20, num_std=2.0):
+        """Middle/upper/lower bands plus %B and bandwidth"""
+        middle = close.rolling(window).mean()
+        std = close.rolling(window).std(ddof=0)
+        upper = middle + num_std * std
+        lower = middle - num_std * std
+        return {
+            'middle': middle,
+            'upper': upper,
+            'lower': lower,
+            'pct_b': (close - lower) / (upper - lower),
+            'bandwidth': (upper - lower) / middle
+        }
+
+    @staticmethod
+    def macd(close, fast=12, slow=26, signal=9):
+        line = StockIndicators.ema(close, fast) - StockIndicators.ema(close, slow)
+        signal_line = line.ewm(span=signal, adjust=False, min_periods=signal).mean()
+        return {'macd': line, 'signal': signal_line, 'hist': line - signal_line}
+
+    @staticmethod
+    def atr(high, low, close, window=14):
+        """Wilder's average true range"""
+        prev_close = close.shift()
+        true_range = np.maximum(high - low, np.maximum((high - prev_close).abs(), (low - prev_close).abs()))
+        return true_range.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+
+    @staticmethod
+    def volatility(close, window=20):
+        """Annualized rolling volatility of daily log returns, in percent"""
+        log_returns = np.log(close / close.shift())
+        return log_returns.rolling(window).std() * np.sqrt(TRADING_DAYS) * 100
+
+    @staticmethod
+    def snapshot(history):
+        """Latest indicator values per ticker from a batch frame keyed by (ticker, field)"""
+        close = history.xs('Close', axis=1, level='Price')
+        high = history.xs('High', axis=1, level='Price')
+        low = history.xs('Low', axis=1, level='Price')
+
+        # Rolling-window indicators only need the tail; the EMA-based ones need everything
+        tail = close.iloc[-2 * SNAPSHOT_TAIL:]
+        bands = StockIndicators.bollinger(tail)
+        macd = StockIndicators.macd(close)
+        atr = StockIndicators.atr(high, low, close)
+        ema_20 = StockIndicators.ema(close, 20)
+        ema_50 = StockIndicators.ema(close, 50)
+
+        columns = {
+            'rsi_14': StockIndicators.rsi(close),
+            'bb_pct_b': bands['pct_b'],
+            'bb_width': bands['bandwidth'],
+            'macd': macd['macd'],
+            'macd_signal': macd['signal'],
+            'macd_hist': macd['hist'],
+            'atr_14': atr,
+            'atr_pct': atr / close * 100,
+            'ema_20': ema_20,
+            'ema_50': ema_50,
+            'ema_gap_pct': (ema_20 / ema_50 - 1) * 100,
+            'volatility_20': StockIndicators.volatility(tail)
+        }
+        # Tickers can end on different dates, so take each column's last valid value
+        latest = {name: frame.iloc[-SNAPSHOT_TAIL:].ffill().iloc[-1] for name, frame in columns.items()}
+        return pd.DataFrame(latest).round(4)
+
+    @staticmethod
+    def snapshot_table(history, executor=None):
+        """snapshot() of a batch frame, computed in blocks of tickers on `executor` (serial by default)"""
+        if executor is None or history.empty:
+            return StockIndicators.snapshot(history)
+        tickers = list(dict.fromkeys(history.columns.get_level_values('Ticker')))
+        columns = pd.MultiIndex.from_product([tickers, SNAPSHOT_FIELDS], names=['Ticker', 'Price'])
+        # (dates, tickers * fields) -> (tickers, fields, dates), the layout the executor splits by row
+        block = history.reindex(columns=columns).to_numpy(dtype='float64')
+        values = block.T.reshape(len(tickers), len(SNAPSHOT_FIELDS), len(history.index))
+        func = functools.partial(StockIndicators._snapshot_block, dates=history.index)
+        return pd.concat(executor.map_blocks(func, values, tickers))
+
+    @staticmethod
+    def _snapshot_block(values, tickers, dates):
+        """snapshot() of a (tickers, SNAPSHOT_FIELDS, dates) array"""
+        columns = pd.MultiIndex.from_product([tickers, SNAPSHOT_FIELDS], names=['Ticker', 'Price'])
+        frame = pd.DataFrame(values.reshape(len(tickers) * len(SNAPSHOT_FIELDS), -1).T, index=dates, columns=columns)
+        return StockIndicators.snapshot(frame)
+
+    @staticmethod
+    def risk_metrics(close):
+        """Drawdown and return-distribution risk figures for one ticker's close prices"""
+        close = close[~np.isnan(close)]
+        if len(close) < 3:
+            return {}
+        returns = np.diff(np.log(close))
+        drawdown = close / np.maximum.accumulate(close) - 1
+        std = returns.std(ddof=1)
+        downside = returns[returns < 0]
+        var_95 = -np.percentile(returns, 5)
+        tail = returns[returns <= -var_95]
+        return {
+            'max_drawdown_pct': drawdown.min() * 100,
+            'sharpe': returns.mean() / std * np.sqrt(TRADING_DAYS) if std else np.nan,
+            'sortino': returns.mean() / downside.std(ddof=1) * np.sqrt(TRADING_DAYS) if len(downside) > 1 else np.nan,
+            'var_95_pct': var_95 * 100,
+            'cvar_95_pct': -tail.mean() * 100 if len(tail) else np.nan
+        }
+
+    @staticmethod
+    def risk_table(history, executor=None):
+        """Risk metrics per ticker from a batch frame, computed on `executor` (serial by default)"""
+        close = history.xs('Close', axis=1, level='Price')
+        matrix = close.to_numpy(dtype='float64').T
+        if executor is None:
+            results = {ticker: StockIndicators.risk_metrics(row) for ticker, row in zip(close.columns, matrix)}
+        else:
+            results = executor.map_rows(StockIndicators.risk_metrics, matrix, list(close.columns))
+        return pd.DataFrame.from_dict(results, orient='index').round(4)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 16:30:12 2026
+
+Rate limiting shared by the batch runner and the network clients
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, count, capacity=None):
+        return cls(count / 60.0, capacity)
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if available and return 0, else return the seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available"""
+        # A request larger than the bucket could never be served, so cap it
+        tokens = min(tokens, self.capacity)
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def charge(self, tokens):
+        """Take `tokens` without waiting, e.g. to settle an estimate; the bucket may go negative"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens - tokens)
+
+
+class CallLimiter:
+    """At most `in_flight` calls running at once, started at no more than `per_minute`"""
+
+    def __init__(self, per_minute, in_flight, burst=1):
+        self.bucket = TokenBucket.per_minute(per_minute, capacity=burst)
+        self._slots = threading.BoundedSemaphore(in_flight)
+
+    def call(self, produce):
+        """`produce()`'s result, run once a slot and a rate token are free"""
+        with self._slots:
+            self.bucket.acquire()
+            return produce()
+
+
+class FairTokenBudget:
+    """Token bucket shared by several clients, served round-robin
+
+    Waiting requests form one FIFO queue per client. Each grant moves its
+    client to the back of the rotation, so a session that queued many
+    calls cannot starve one that queued a single call after it.
+    """
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self._queues = {}
+        self._turns = deque()
+        self._condition = threading.Condition()
+
+    def acquire(self, client, tokens):
+        """Block until it is `client`'s turn and `tokens` are available; returns the seconds waited"""
+        tokens = min(tokens, self.bucket.capacity)
+        started = time.monotonic()
+        ticket = object()
+        with self._condition:
+            if client not in self._queues:
+                self._queues[client] = deque()
+                self._turns.append(client)
+            self._queues[client].append(ticket)
+            granted = False
+            try:
+                while True:
+                    if self._turns[0] == client and self._queues[client][0] is ticket:
+                        wait = self.bucket.try_acquire(tokens)
+                        if not wait:
+                            granted = True
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+            finally:
+                # Also when the wait is interrupted, so no one queues behind a dead ticket
+                self._leave(client, ticket, granted)
+        return time.monotonic() - started
+
+    def _leave(self, client, ticket, granted):
+        """Take `ticket` out of the queue; a granted one also ends `client`'s turn"""
+        queue = self._queues[client]
+        queue.remove(ticket)
+        if granted:
+            self._turns.popleft()
+            if queue:
+                self._turns.append(client)
+        elif not queue:
+            self._turns.remove(client)
+        if not queue:
+            del self._queues[client]
+        self._condition.notify_all()
+
+    def waiting(self):
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 02:38:51 2026
+
+Live intraday mode: ticks from a pluggable source (simulator, replay of
+recorded or stored bars, or polled 1-minute chart bars) feed per-symbol
+rolling EMA, RSI, Bollinger and session VWAP state that costs O(1) per tick.
+A background thread drives the source; the page only reads snapshots.
+
+    python stock_live.py --symbols 500 --seconds 5    # simulator throughput
+"""
+
+import argparse
+import math
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, time as clock, timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_calendar import MARKET_TIMEZONE
+from stock_config import LIVE_IDLE_SECONDS, LIVE_POLL_SECONDS, LIVE_TICKS_PER_SECOND
+
+EMA_SPAN = 20
+RSI_WINDOW = 14
+BOLLINGER_WINDOW = 20
+BOLLINGER_STD = 2.0
+
+# Seconds of engine history the ticks-per-second figure is averaged over
+RATE_WINDOW = 5.0
+
+# Columnar batch of ticks: parallel lists, so a batch costs no per-tick objects
+Ticks = namedtuple('Ticks', ['tickers', 'timestamps', 'prices', 'volumes'])
+
+NO_TICKS = Ticks([], [], [], [])
+
+# Shared engines keyed by (source name, frozenset of symbols)
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _session_end(timestamp):
+    """Epoch seconds of the exchange midnight after `timestamp`, when session VWAP starts over"""
+    day = datetime.fromtimestamp(timestamp, MARKET_TIMEZONE).date() + timedelta(days=1)
+    return datetime.combine(day, clock(), MARKET_TIMEZONE).timestamp()
+
+
+class SymbolState:
+    """Rolling indicators of one symbol, updated in O(1) per tick
+
+    EMA and RSI follow StockIndicators (adjust=False smoothing, valid after
+    their window); Bollinger bands keep a ring buffer of the last prices with
+    running sums; VWAP covers the current exchange day.
+    """
+
+    __slots__ = ('ticks', 'price', 'timestamp', 'ema', 'avg_gain', 'avg_loss', 'ring', 'ring_pos',
+                 'ring_sum', 'ring_sumsq', 'session_end', 'session_value', 'session_volume')
+
+    def __init__(self, bollinger_window=BOLLINGER_WINDOW):
+        self.ticks = 0
+        self.price = self.timestamp = self.ema = math.nan
+        self.avg_gain = self.avg_loss = 0.0
+        self.ring = [0.0] * bollinger_window
+        self.ring_pos = 0
+        self.ring_sum = self.ring_sumsq = 0.0
+        self.session_end = -math.inf
+        self.session_value = self.session_volume = 0.0
+
+    def update(self, timestamp, price, volume, ema_alpha, rsi_alpha):
+        if self.ticks:
+            change = price - self.price
+            self.ema += ema_alpha * (price - self.ema)
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            if self.ticks == 1:
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain += rsi_alpha * (gain - self.avg_gain)
+                self.avg_loss += rsi_alpha * (loss - self.avg_loss)
+        else:
+            self.ema = price
+        self.ticks += 1
+        self.price = price
+        self.timestamp = timestamp
+
+        # Unfilled slots hold 0.0, so the running sums are right from the first tick
+        ring = self.ring
+        pos = self.ring_pos
+        old = ring[pos]
+        ring[pos] = price
+        self.ring_sum += price - old
+        self.ring_sumsq += price * price - old * old
+        pos += 1
+        if pos == len(ring):
+            pos = 0
+            # Re-summed once per window, so rounding cannot drift: still O(1) amortized
+            self.ring_sum = math.fsum(ring)
+            self.ring_sumsq = math.fsum(value * value for value in ring)
+        self.ring_pos = pos
+
+        if timestamp >= self.session_end:
+            self.session_end = _session_end(timestamp)
+            self.session_value = self.session_volume = 0.0
+        self.session_value += price * volume
+        self.session_volume += volume
+
+    def values(self, ema_span=EMA_SPAN, rsi_window=RSI_WINDOW, num_std=BOLLINGER_STD):
+        """Current indicator values; NaN until their window is filled"""
+        window = len(self.ring)
+        middle = upper = lower = pct_b = math.nan
+        if self.ticks >= window:
+            middle = self.ring_sum / window
+            std = math.sqrt(max(self.ring_sumsq / window - middle * middle, 0.0))
+            upper, lower = middle + num_std * std, middle - num_std * std
+            pct_b = (self.price - lower) / (upper - lower) if upper > lower else math.nan
+
+        rsi = math.nan
+        if self.ticks > rsi_window:
+            # No losses in the window means RSI 100, as in StockIndicators.rsi
+            rsi = 100 - 100 / (1 + self.avg_gain / self.avg_loss) if self.avg_loss else 100.0
+
+        return {
+            'price': self.price,
+            f'ema_{ema_span}': self.ema if self.ticks >= ema_span else math.nan,
+            f'rsi_{rsi_window}': rsi,
+            'bb_lower': lower,
+            'bb_middle': middle,
+            'bb_upper': upper,
+            'bb_pct_b': pct_b,
+            'vwap': self.session_value / self.session_volume if self.session_volume else math.nan,
+            'session_volume': self.session_volume,
+            'ticks': self.ticks,
+            'updated': self.timestamp
+        }
+
+
+class QuoteSource:
+    """Where live ticks come from
+
+    poll() returns the Ticks that arrived since the previous call (NO_TICKS if
+    none) and must not block for long; the engine sleeps `idle` seconds after
+    an empty poll.
+    """
+
+    idle = 0.05
+
+    def __init__(self, symbols):
+        self.symbols = list(dict.fromkeys(symbols))
+
+    def poll(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SimulatedSource(QuoteSource):
+    """Random-walk ticks at a steady rate, spread randomly over the symbols
+
+    `ticks_per_second=None` generates `max_batch` ticks per poll as fast as the
+    engine takes them, for throughput tests.
+    """
+
+    def __init__(self, symbols, ticks_per_second=LIVE_TICKS_PER_SECOND, start_prices=None,
+                 volatility=0.0005, seed=None, max_batch=50_000):
+        super().__init__(symbols)
+        start_prices = start_prices or {}
+        self.ticks_per_second = ticks_per_second
+        self.volatility = volatility
+        self.max_batch = max_batch
+        self._log_prices = np.log([float(start_prices.get(symbol) or 100.0) for symbol in self.symbols])
+        self._names = np.array(self.symbols, dtype=object)
+        self._rng = np.random.default_rng(seed)
+        self._started = time.monotonic()
+        self._emitted = 0
+        self._last_wall = time.time()
+
+    @classmethod
+    def from_store(cls, symbols, store=None, **options):
+        """Simulator starting from each symbol's last stored close (100 for symbols not stored)"""
+        from stock_utils import StockUtils
+
+        histories = (store or StockUtils.price_store()).get_histories(symbols, '5d', refresh=False)
+        start_prices = {}
+        for ticker in histories:
+            close = histories[ticker].column('Close')
+            close = close[~np.isnan(close)]
+            if len(close):
+                start_prices[ticker] = float(close[-1])
+        return cls(symbols, start_prices=start_prices, **options)
+
+    def poll(self):
+        if self.ticks_per_second is None:
+            count = self.max_batch
+        else:
+            due = int((time.monotonic() - self._started) * self.ticks_per_second) - self._emitted
+            count = min(due, self.max_batch)
+        if count <= 0 or not self.symbols:
+            return NO_TICKS
+        self._emitted += count
+
+        rows = self._rng.integers(0, len(self.symbols), count)
+        shocks = self._rng.normal(0.0, self.volatility, count)
+        # Each symbol's ticks of the batch walk on from its last price: cumulative
+        # sums of its shocks, in tick order, with every symbol's run grouped together
+        order = np.argsort(rows, kind='stable')
+        grouped, walk = rows[order], np.cumsum(shocks[order])
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        walk -= np.repeat(np.r_[0.0, walk[starts[1:] - 1]], np.diff(np.r_[starts, count]))
+        log_prices = np.empty(count)
+        log_prices[order] = self._log_prices[grouped] + walk
+        ends = np.r_[starts[1:], count] - 1
+        self._log_prices[grouped[ends]] += walk[ends]
+
+        wall = time.time()
+        timestamps = np.linspace(self._last_wall, wall, count, endpoint=False)
+        self._last_wall = wall
+        volumes = self._rng.integers(1, 10, count) * 100.0
+        return Ticks(self._names[rows].tolist(), timestamps.tolist(),
+                     np.round(np.exp(log_prices), 2).tolist(), volumes.tolist())
+
+
+class ReplaySource(QuoteSource):
+    """Replays recorded ticks in market time, `speed` market seconds per wall-clock second
+
+    `ticks` is a frame with ticker, timestamp (epoch seconds), price and volume
+    columns. With `loop` the recording starts over, shifted to the next days so
+    sessions stay in order.
+    """
+
+    def __init__(self, ticks, speed=1.0, loop=True, max_batch=50_000):
+        ticks = ticks.sort_values('timestamp', kind='stable')
+        super().__init__(ticks['ticker'].unique())
+        self.speed = speed
+        self.loop = loop
+        self.max_batch = max_batch
+        self._tickers = ticks['ticker'].to_numpy(dtype=object)
+        self._timestamps = ticks['timestamp'].to_numpy(dtype='float64')
+        self._prices = ticks['price'].to_numpy(dtype='float64')
+        self._volumes = ticks['volume'].fillna(0).to_numpy(dtype='float64')
+        self._pos = 0
+        self._offset = 0.0
+        self._started = time.monotonic()
+
+    @classmethod
+    def from_csv(cls, path, **options):
+        return cls(pd.read_csv(path), **options)
+
+    @classmethod
+    def from_store(cls, symbols, period='1y', store=None, speed=24 * 60 * 60, **options):
+        """Daily closes from the price store as ticks at each session's close; one day per second by default"""
+        from stock_utils import StockUtils
+
+        histories = (store or StockUtils.price_store()).get_histories(symbols, period, refresh=False)
+        closes = histories.dates.tz_localize(MARKET_TIMEZONE) + pd.Timedelta(hours=16)
+        frames = []
+        for ticker in histories:
+            history = histories[ticker]
+            close, volume = history.column('Close'), history.column('Volume')
+            valid = ~np.isnan(close)
+            frames.append(pd.DataFrame({
+                'ticker': ticker,
+                'timestamp': closes[valid].as_unit('ns').asi8 / 1e9,
+                'price': close[valid].astype('float64'),
+                'volume': volume[valid].astype('float64')
+            }))
+        if not frames:
+            frames = [pd.DataFrame(columns=['ticker', 'timestamp', 'price', 'volume'])]
+        return cls(pd.concat(frames, ignore_index=True), speed=speed, **options)
+
+    def poll(self):
+        if not len(self._timestamps):
+            return NO_TICKS
+        if self._pos == len(self._timestamps):
+            if not self.loop:
+                return NO_TICKS
+            span = self._timestamps[-1] - self._timestamps[0]
+            self._offset += math.ceil(span / 86400 + 1) * 86400
+            self._pos = 0
+            self._started = time.monotonic()
+
+        market_now = self._timestamps[0] + (time.monotonic() - self._started) * self.speed
+        end = min(int(np.searchsorted(self._timestamps, market_now, side='right')), self._pos + self.max_batch)
+        if end <= self._pos:
+            return NO_TICKS
+        rows = slice(self._pos, end)
+        self._pos = end
+        return Ticks(self._tickers[rows].tolist(), (self._timestamps[rows] + self._offset).tolist(),
+                     self._prices[rows].tolist(), self._volumes[rows].tolist())
+
+
+class ChartBarSource(QuoteSource):
+    """Completed intraday bars of the chart API, polled every `poll_seconds`
+
+    Each bar becomes one tick at its close time; the bar still forming is
+    skipped until the next poll, so its volume is never counted twice.
+    """
+
+    idle = 1.0
+
+    def __init__(self, symbols, poll_seconds=LIVE_POLL_SECONDS, interval='1m'):
+        super().__init__(symbols)
+        self.poll_seconds = poll_seconds
+        self.interval = interval
+        self.bar_seconds = pd.Timedelta(interval.replace('m', 'min')).total_seconds()
+        self.errors = {}
+        self._seen = {}
+        self._next_poll = 0.0
+
+    def poll(self):
+        if time.monotonic() < self._next_poll:
+            return NO_TICKS
+        from stock_market_data import AsyncMarketDataClient
+
+        bars, self.errors = AsyncMarketDataClient.call(self._fetch)
+        self._next_poll = time.monotonic() + self.poll_seconds
+
+        ticks = Ticks([], [], [], [])
+        for ticker, frame in bars.items():
+            starts = frame.index.as_unit('ns').asi8 / 1e9
+            # The last bar is still forming
+            new = (starts > self._seen.get(ticker, -math.inf)) & (np.arange(len(frame)) < len(frame) - 1)
+            if not new.any():
+                continue
+            self._seen[ticker] = starts[new][-1]
+            ticks.tickers.extend([ticker] * int(new.sum()))
+            ticks.timestamps.extend((starts[new] + self.bar_seconds).tolist())
+            ticks.prices.extend(frame['Close'].to_numpy()[new].tolist())
+            ticks.volumes.extend(frame['Volume'].fillna(0).to_numpy()[new].tolist())
+        return ticks
+
+    async def _fetch(self, client):
+        import asyncio
+
+        from stock_market_data import MarketDataError
+
+        results = await asyncio.gather(
+            *(client.intraday(symbol, self.interval) for symbol in self.symbols), return_exceptions=True
+        )
+        bars, errors = {}, {}
+        for symbol, result in zip(self.symbols, results):
+            if isinstance(result, Exception):
+                errors[symbol] = result if isinstance(result, MarketDataError) else MarketDataError(symbol, str(result))
+            else:
+                bars[symbol] = result
+        return bars, errors
+
+
+# Source name -> factory taking the symbol list
+SOURCES = {
+    'simulator': SimulatedSource.from_store,
+    'replay': ReplaySource.from_store,
+    'chart': ChartBarSource
+}
+
+
+class LiveEngine:
+    """Per-symbol rolling state fed from one QuoteSource by a background thread"""
+
+    def __init__(self, source, ema_span=EMA_SPAN, rsi_window=RSI_WINDOW, bollinger_window=BOLLINGER_WINDOW,
+                 idle_seconds=None):
+        self.source = source
+        self.idle_seconds = idle_seconds
+        self.last_used = time.monotonic()
+        self.key = None
+        self.ema_span = ema_span
+        self.rsi_window = rsi_window
+        self.bollinger_window = bollinger_window
+        self.states = {}
+        self.ticks = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._samples = deque(maxlen=1024)
+
+    @staticmethod
+    def shared(name, symbols):
+        """The process's running engine for source `name` over `symbols`
+
+        Every session watching the same source and symbols reads one engine.
+        An engine nobody has asked for in LIVE_IDLE_SECONDS stops itself, so
+        sessions that turn Live Mode off or go away do not keep it running.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        key = (name, frozenset(symbols))
+        engine = LiveEngine._lookup(key)
+        if engine is not None:
+            return engine
+        # Build the source outside the lock: it may read the whole price store
+        engine = LiveEngine(SOURCES[name](symbols), idle_seconds=LIVE_IDLE_SECONDS)
+        engine.key = key
+        with _engines_lock:
+            running = _engines.get(key)
+            if running is not None and running.running:
+                running.last_used = time.monotonic()
+            else:
+                running = _engines[key] = engine.start()
+        if running is not engine:
+            engine.source.close()
+        return running
+
+    @staticmethod
+    def _lookup(key):
+        """The running engine registered under `key`, marked as used"""
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None or not engine.running:
+                return None
+            engine.last_used = time.monotonic()
+            return engine
+
+    def process(self, ticks):
+        """Apply one batch of ticks; returns the number applied"""
+        states, window = self.states, self.bollinger_window
+        ema_alpha, rsi_alpha = 2 / (self.ema_span + 1), 1 / self.rsi_window
+        with self._lock:
+            for ticker, timestamp, price, volume in zip(*ticks):
+                state = states.get(ticker)
+                if state is None:
+                    state = states[ticker] = SymbolState(window)
+                state.update(timestamp, price, volume, ema_alpha, rsi_alpha)
+            self.ticks += len(ticks.tickers)
+        return len(ticks.tickers)
+
+    def snapshot(self, symbols=None):
+        """Current indicators per symbol, one row each"""
+        with self._lock:
+            names = [symbol for symbol in (self.states if symbols is None else symbols) if symbol in self.states]
+            rows = [self.states[symbol].values(self.ema_span, self.rsi_window) for symbol in names]
+        frame = pd.DataFrame(rows, index=pd.Index(names, name='ticker')).round(4)
+        if not frame.empty:
+            frame['updated'] = pd.to_datetime(frame['updated'], unit='s', utc=True).dt.tz_convert(MARKET_TIMEZONE)
+        return frame
+
+    def stats(self):
+        """Ticks processed, symbols seen and the recent ticks per second"""
+        now = time.monotonic()
+        samples = [sample for sample in list(self._samples) if sample[0] >= now - RATE_WINDOW]
+        rate = 0.0
+        if len(samples) > 1 and samples[-1][0] > samples[0][0]:
+            rate = (samples[-1][1] - samples[0][1]) / (samples[-1][0] - samples[0][0])
+        return {'ticks': self.ticks, 'symbols': len(self.states), 'ticks_per_second': rate,
+                'running': self.running, 'error': self.last_error}
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Run in a daemon thread until stop(); returns immediately"""
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name='stock-live', daemon=True)
+            self._thread.start()
+        return self
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            idle = self.idle_seconds is not None and time.monotonic() - self.last_used > self.idle_seconds
+            if idle and self._expired():
+                break
+            try:
+                ticks = self.source.poll()
+            except Exception as e:
+                # A failed poll (e.g. the chart API is down) is retried after the idle wait
+                self.last_error = str(e)
+                ticks = NO_TICKS
+            count = self.process(ticks) if ticks.tickers else 0
+            self._samples.append((time.monotonic(), self.ticks))
+            if not count:
+                self._stop.wait(self.source.idle)
+        self._unregister()
+        self.source.close()
+
+    def _expired(self):
+        """Unregister and report True once no session has asked for the engine in idle_seconds"""
+        with _engines_lock:
+            # Checked under the lock, so shared() never hands out an engine that is about to stop
+            if time.monotonic() - self.last_used <= self.idle_seconds:
+                return False
+            self._unregister_locked()
+        return True
+
+    def _unregister(self):
+        with _engines_lock:
+            self._unregister_locked()
+
+    def _unregister_locked(self):
+        if self.key is not None and _engines.get(self.key) is self:
+            del _engines[self.key]
+
+    def stop(self):
+        """Stop the thread and wait for it; never call while holding _engines_lock"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        else:
+            self._unregister()
+            self.source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the live engine on simulated ticks")
+    parser.add_argument('--symbols', type=int, default=500, help="Number of simulated symbols")
+    parser.add_argument('--seconds', type=float, default=5.0, help="How long to run")
+    parser.add_argument('--rate', type=float, default=None, help="Ticks per second (default: as fast as possible)")
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    engine = LiveEngine(SimulatedSource(symbols, ticks_per_second=args.rate, seed=0, max_batch=10_000))
+    engine.start()
+    time.sleep(args.seconds)
+    engine.stop()
+    stats = engine.stats()
+    print(f"{stats['ticks']:,} ticks over {stats['symbols']} symbols in {args.seconds:.0f}s: "
+          f"{stats['ticks'] / args.seconds:,.0f} ticks/s")
+    print(engine.snapshot(symbols[:5]).drop(columns='updated').to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 14:08:52 2026
+
+Content-addressed cache of LLM responses, stored in SQLite with TTL and LRU eviction
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from stock_config import CACHE_DIR, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+
+
+class ResponseCache:
+    """Maps (model, temperature, agent role, rendered prompt) to the model's answer"""
+
+    def __init__(self, path=None, ttl_seconds=LLM_CACHE_TTL_SECONDS, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path or CACHE_DIR / 'llm_responses.sqlite'
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(model, temperature, role, prompt):
+        payload = json.dumps([model, temperature, role, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Cached response for `key`, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._db:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, response):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            self._db.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,))
+            # Least recently used entries go first once the cache is full
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+    def stats(self):
+        """Hit/miss counters of this process plus the number of stored entries"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': entries
+        }
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 01:05:33 2026
+
+Per-process gateway in front of the LLM: identical prompts in flight are
+sent once (single-flight), per-ticker prompts arriving together share one
+multi-ticker call, and every call waits for a tokens-per-minute budget that
+is served fairly across sessions
+"""
+
+import hashlib
+import json
+import re
+import threading
+from concurrent.futures import Future
+
+from stock_config import LLM_BATCH_WINDOW_SECONDS, LLM_COMPLETION_TOKENS, LLM_MAX_BATCH, LLM_TOKENS_PER_MINUTE
+from stock_limits import FairTokenBudget, TokenBucket
+from stock_prompts import StockPrompts
+from stock_tracing import Tracer
+
+_gateway = None
+
+# Heading the model is told to put before each item's answer in a batched prompt
+SECTION_MARKER = "### ITEM:"
+
+
+class _Batch:
+    """Per-item prompts waiting to go out together"""
+
+    def __init__(self):
+        self.items = {}
+        self.full = threading.Event()
+
+
+class LLMGateway:
+    """Shared by every session of the process; see the module docstring"""
+
+    def __init__(self, tokens_per_minute=LLM_TOKENS_PER_MINUTE, completion_tokens=LLM_COMPLETION_TOKENS,
+                 batch_window=LLM_BATCH_WINDOW_SECONDS, max_batch=LLM_MAX_BATCH):
+        self.budget = FairTokenBudget(TokenBucket.per_minute(tokens_per_minute, capacity=tokens_per_minute))
+        self.completion_tokens = completion_tokens
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._batches = {}
+        self._counters = {'calls': 0, 'deduplicated': 0, 'batches': 0, 'batched_items': 0, 'waited_s': 0.0}
+
+    @staticmethod
+    def shared():
+        """Process-wide gateway"""
+        global _gateway
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
+
+    def call(self, key, produce, prompt_tokens, client='default'):
+        """Result of `produce()`, run once for every concurrent caller with the same `key`
+
+        The caller that runs it first waits for `prompt_tokens` plus an answer
+        allowance from the budget, in `client`'s turn; a string result settles
+        the allowance with its real size.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self._counters['deduplicated'] += 1
+        if not leader:
+            with Tracer.span('llm_shared'):
+                return future.result()
+
+        waited = 0.0
+        try:
+            reserved = prompt_tokens + self.completion_tokens
+            with Tracer.span('llm_budget', tokens=reserved) as span:
+                waited = self.budget.acquire(client, reserved)
+                span.set(waited_s=round(waited, 3))
+            result = produce()
+            if isinstance(result, str):
+                self.budget.bucket.charge(StockPrompts.estimate_tokens(result) - self.completion_tokens)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._counters['calls'] += 1
+                self._counters['waited_s'] += waited
+
+    def batched(self, llm, system, instructions, item, text, client='default'):
+        """Answer for one `item` (e.g. a ticker) described by `text`
+
+        Items with the same `system` and `instructions` that arrive within
+        `batch_window` seconds go out as one prompt listing them all, and the
+        answer is split back per item. Items the model skipped are asked again
+        on their own.
+        """
+        group = self.make_key(self._model(llm), system, instructions)
+        with self._lock:
+            batch = self._batches.get(group)
+            leader = batch is None
+            if leader:
+                batch = self._batches[group] = _Batch()
+            queued = batch.items.get(item)
+            if queued is None:
+                queued = batch.items[item] = (text, Future())
+            if len(batch.items) >= self.max_batch:
+                batch.full.set()
+
+        if queued[0] != text:
+            # Same ticker with other figures (e.g. another period): not this batch's answer
+            return self._complete(llm, system, f"{instructions}\n\n{text}", client, [item])
+        if leader:
+            batch.full.wait(self.batch_window)
+            with self._lock:
+                del self._batches[group]
+            self._run_batch(llm, system, instructions, batch, client)
+        return queued[1].result()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        counters['waited_s'] = round(counters['waited_s'], 1)
+        return {**counters, 'queued': self.budget.waiting()}
+
+    def _run_batch(self, llm, system, instructions, batch, client):
+        items = list(batch.items.items())
+        answers, error = {}, None
+        try:
+            if len(items) == 1:
+                [(item, (text, _))] = items
+                answers = {item: self._complete(llm, system, f"{instructions}\n\n{text}", client, [item])}
+            else:
+                names = [item for item, _ in items]
+                with Tracer.span('llm_batch', items=len(items)):
+                    raw = self._complete(llm, system, self._batch_prompt(instructions, items), client, names)
+                    answers = self._split(raw, names)
+                with self._lock:
+                    self._counters['batches'] += 1
+                    self._counters['batched_items'] += len(items)
+                for item, (text, _) in items:
+                    if item not in answers:
+                        answers[item] = self._complete(llm, system, f"{instructions}\n\n{text}", client, [item])
+        except BaseException as e:
+            # An error reaches every caller, the leader too, through its future
+            error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            # Also when the leader is interrupted, so no follower waits forever
+            for item, (_, future) in items:
+                if error is None:
+                    future.set_result(answers[item])
+                else:
+                    future.set_exception(error)
+
+    def _complete(self, llm, system, user, client, items=()):
+        """Answer of one prompt through call(), traced with its token counts and the `items` it covers"""
+        key = self.make_key(self._model(llm), system, user)
+        tokens = StockPrompts.estimate_tokens(system + user)
+        sent = []
+
+        def produce():
+            sent.append(True)
+            return self.complete(llm, [("system", system), ("human", user)])
+
+        with Tracer.span('llm_complete', items=list(items)) as span:
+            raw = self.call(key, produce, tokens, client)
+            # An answer shared from another caller's identical call cost this run nothing
+            span.set(shared=not sent, prompt_chars=len(system) + len(user), response_chars=len(raw),
+                     prompt_tokens=tokens if sent else 0,
+                     completion_tokens=StockPrompts.estimate_tokens(raw) if sent else 0, token_counts='estimate')
+        return raw
+
+    @staticmethod
+    def _batch_prompt(instructions, items):
+        sections = "\n\n".join(f"{SECTION_MARKER}{item}\n{text}" for item, (text, _) in items)
+        return (
+            f"{instructions}\n\n"
+            f"Answer for each of the {len(items)} items below separately. Start each answer with a line "
+            f"'{SECTION_MARKER}<item>' naming the item, exactly as in the headings below, and use no "
+            f"other line starting with '{SECTION_MARKER}'.\n\n{sections}"
+        )
+
+    @staticmethod
+    def _split(raw, items):
+        """item -> answer text of a batched answer
+
+        Only marker lines naming one of the requested `items` start a new
+        answer, so headings the model writes inside an answer stay part of it.
+        """
+        names = "|".join(re.escape(item) for item in sorted(items, key=len, reverse=True))
+        section = re.compile(rf"^{re.escape(SECTION_MARKER)}\s*({names})\s*$", re.MULTILINE)
+        parts = section.split(raw)
+        # parts: [preamble, item, answer, item, answer, ...]
+        return {item: answer.strip() for item, answer in zip(parts[1::2], parts[2::2])}
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _model(llm):
+        return getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or str(llm)
+
+    @staticmethod
+    def complete(llm, messages):
+        """Plain chat completion of (role, text) messages through a LangChain chat model or a crewai LLM"""
+        if hasattr(llm, 'invoke'):
+            return LLMGateway.direct(llm).invoke(messages).content
+        return llm.call([{'role': 'user' if role == 'human' else role, 'content': text} for role, text in messages])
+
+    @staticmethod
+    def direct(llm):
+        """The chat model, addressed by its bare model name
+
+        The LiteLLM-style `groq/` prefix crewai needs for routing is not a
+        model name the Groq API itself accepts.
+        """
+        model = getattr(llm, 'model_name', None) or ""
+        if model.startswith('groq/') and hasattr(llm, 'model_copy'):
+            return llm.model_copy(update={'model_name': model.split('/', 1)[1]})
+        return llm
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 22:19:33 2026
+
+Asyncio client for Yahoo's chart API: one pooled connection set, a cap on
+concurrent requests per host, a process-wide token bucket and jittered
+exponential backoff on 429/5xx. Sync callers share one client whose session
+lives on a background event loop. Failures come back as MarketDataError
+values per ticker instead of being swallowed.
+"""
+
+import asyncio
+import atexit
+import random
+import threading
+import time
+from datetime import timezone
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+from curl_cffi.requests import AsyncSession
+
+from stock_config import MARKET_DATA_PER_HOST, MARKET_DATA_REQUESTS_PER_SECOND
+from stock_limits import TokenBucket
+
+CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
+
+# Shared by every client in the process, so parallel callers cannot add up to a ban
+_bucket = TokenBucket(MARKET_DATA_REQUESTS_PER_SECOND, capacity=MARKET_DATA_REQUESTS_PER_SECOND)
+
+# Process-wide client and the event loop thread its session lives on; see AsyncMarketDataClient.shared
+_shared_client = None
+_shared_loop = None
+_shared_lock = threading.Lock()
+
+
+class MarketDataError(Exception):
+    """Why one ticker could not be fetched"""
+
+    def __init__(self, ticker, message, status=None, attempts=1, retryable=False):
+        super().__init__(message)
+        self.ticker = ticker
+        self.message = message
+        self.status = status
+        self.attempts = attempts
+        self.retryable = retryable
+
+    def __str__(self):
+        status = f"HTTP {self.status}, " if self.status is not None else ""
+        return f"{self.message} ({status}{self.attempts} attempt{'s' if self.attempts != 1 else ''})"
+
+    def __reduce__(self):
+        # Copied and pickled with its fields (pandas deep-copies frame attrs)
+        return MarketDataError, (self.ticker, self.message, self.status, self.attempts, self.retryable)
+
+    def to_dict(self):
+        return {'ticker': self.ticker, 'message': self.message, 'status': self.status,
+                'attempts': self.attempts, 'retryable': self.retryable}
+
+
+class AsyncMarketDataClient:
+    """Daily OHLCV bars for many tickers over one pooled async session
+
+        async with AsyncMarketDataClient() as client:
+            bars, errors = await client.histories(['AAPL', 'MSFT'], period='1y')
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, per_host=MARKET_DATA_PER_HOST, max_retries=4, base_delay=0.5, max_delay=30.0,
+                 timeout=20, chart_url=None, bucket=None):
+        self.per_host = per_host
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.chart_url = chart_url or CHART_URL
+        self.bucket = bucket or _bucket
+        self._session = None
+        self._host_limits = {}
+        # After a 429 every request to that host waits until this moment
+        self._cooldown_until = {}
+
+    async def __aenter__(self):
+        # Impersonation gets past Yahoo's browser checks, like the yfinance session;
+        # connections are pooled and kept alive for the client's lifetime
+        self._session = AsyncSession(impersonate="chrome", max_clients=self.per_host * 4)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+
+    async def histories(self, tickers, period='1mo', start=None):
+        """({ticker: bars}, {ticker: MarketDataError}) for every ticker, fetched concurrently"""
+        tickers = list(dict.fromkeys(tickers))
+        results = await asyncio.gather(
+            *(self.history(ticker, period, start) for ticker in tickers), return_exceptions=True
+        )
+        bars, errors = {}, {}
+        for ticker, result in zip(tickers, results):
+            if isinstance(result, MarketDataError):
+                errors[ticker] = result
+            elif isinstance(result, Exception):
+                errors[ticker] = MarketDataError(ticker, f"{type(result).__name__}: {result}")
+            else:
+                bars[ticker] = result
+        return bars, errors
+
+    async def history(self, ticker, period='1mo', start=None):
+        """Split- and dividend-adjusted daily bars of one ticker, like yf.download(auto_adjust=True)"""
+        params = {'interval': '1d', 'includeAdjustedClose': 'true', 'events': 'div,splits'}
+        if start is not None:
+            params['period1'] = int(pd.Timestamp(start).replace(tzinfo=timezone.utc).timestamp())
+            params['period2'] = int(time.time())
+        else:
+            params['range'] = period
+        payload = await self._get_json(ticker, self.chart_url.format(ticker=ticker), params)
+        return self._parse_chart(ticker, payload)
+
+    async def intraday(self, ticker, interval='1m', period='1d'):
+        """Unadjusted intraday bars of one ticker indexed by UTC bar start; the last bar may still be forming"""
+        params = {'interval': interval, 'range': period, 'includePrePost': 'false'}
+        payload = await self._get_json(ticker, self.chart_url.format(ticker=ticker), params)
+        return self._parse_chart(ticker, payload, daily=False)
+
+    async def _get_json(self, ticker, url, params):
+        host = urlsplit(url).netloc
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+        attempt = 0
+        while True:
+            attempt += 1
+            async with limit:
+                await self._wait_for_slot(host)
+                try:
+                    response = await self._session.get(url, params=params, timeout=self.timeout)
+                    status, retry_after = response.status_code, response.headers.get('Retry-After')
+                    payload = self._json(response)
+                except Exception as e:
+                    # Connection errors and timeouts
+                    status, retry_after, payload = None, None, e
+
+            if status == 200:
+                return payload
+            retryable = status is None or status in self.RETRY_STATUSES
+            if not retryable or attempt > self.max_retries:
+                raise MarketDataError(ticker, self._describe(status, payload), status, attempt, retryable)
+
+            delay = self._backoff(attempt, retry_after)
+            if status == 429:
+                # Yahoo is throttling this host: hold back every request to it, not just this one
+                self._cooldown_until[host] = max(self._cooldown_until.get(host, 0.0), time.monotonic() + delay)
+            await asyncio.sleep(delay)
+
+    async def _wait_for_slot(self, host):
+        pause = self._cooldown_until.get(host, 0.0) - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        while True:
+            wait = self.bucket.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def _backoff(self, attempt, retry_after=None):
+        """Exponential delay with equal jitter; a server's Retry-After takes precedence"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @staticmethod
+    def _json(response):
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _describe(status, payload):
+        if isinstance(payload, Exception):
+            return f"{type(payload).__name__}: {payload}"
+        # Yahoo explains 4xx answers (unknown symbol, bad range) in the chart error
+        error = (payload or {}).get('chart', {}).get('error') if isinstance(payload, dict) else None
+        if error and error.get('description'):
+            return error['description']
+        return "rate limited" if status == 429 else "request failed"
+
+    @staticmethod
+    def _parse_chart(ticker, payload, daily=True):
+        try:
+            result = payload['chart']['result'][0]
+        except (KeyError, IndexError, TypeError):
+            error = (payload or {}).get('chart', {}).get('error') or {}
+            raise MarketDataError(ticker, error.get('description', "malformed chart response"))
+
+        timestamps = result.get('timestamp') or []
+        quote = result['indicators']['quote'][0]
+        bars = pd.DataFrame({
+            'Open': quote.get('open'), 'High': quote.get('high'), 'Low': quote.get('low'),
+            'Close': quote.get('close'), 'Volume': quote.get('volume')
+        }, index=pd.to_datetime(timestamps, unit='s', utc=True), dtype='float64')
+        if bars.empty:
+            raise MarketDataError(ticker, "no price history returned")
+
+        if not daily:
+            bars.index.name = 'Datetime'
+            return bars.dropna(subset=['Close'])
+
+        adjclose = result['indicators'].get('adjclose')
+        if adjclose:
+            ratio = np.asarray(adjclose[0]['adjclose'], dtype='float64') / bars['Close'].to_numpy()
+            bars[['Open', 'High', 'Low']] = bars[['Open', 'High', 'Low']].mul(ratio, axis=0)
+            bars['Close'] = adjclose[0]['adjclose']
+
+        # Daily bars are dated in the exchange's time zone, like yfinance
+        exchange_tz = result.get('meta', {}).get('exchangeTimezoneName', 'America/New_York')
+        bars.index = bars.index.tz_convert(exchange_tz).tz_localize(None).normalize()
+        bars.index.name = 'Date'
+        bars = bars[~bars.index.duplicated(keep='last')]
+        return bars.dropna(how='all')
+
+    @staticmethod
+    def download(tickers, period='1mo', start=None):
+        """Blocking batch download with the StockUtils.download_history contract
+
+        Returns a frame keyed by (ticker, field); tickers that failed are left
+        out and their MarketDataError is in `frame.attrs['errors']`.
+        """
+        bars, errors = AsyncMarketDataClient.call(lambda client: client.histories(tickers, period, start))
+        if bars:
+            history = pd.concat(bars, axis=1, names=['Ticker', 'Price'])
+        else:
+            history = pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=['Ticker', 'Price']))
+        history.attrs['errors'] = errors
+        return history
+
+    @staticmethod
+    def call(request):
+        """Blocking result of `request(client)` on the process-wide client
+
+        `request` is a coroutine function; it runs on the shared client's own
+        event loop, so every sync caller reuses one session and its pooled
+        connections instead of opening a new one per call.
+        """
+        client = AsyncMarketDataClient.shared()
+        return asyncio.run_coroutine_threadsafe(request(client), _shared_loop).result()
+
+    @staticmethod
+    def shared():
+        """Process-wide client whose session stays open on a background event loop until close_shared()"""
+        global _shared_client, _shared_loop
+        with _shared_lock:
+            if _shared_client is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='market-data', daemon=True).start()
+                client = AsyncMarketDataClient()
+                asyncio.run_coroutine_threadsafe(client.__aenter__(), loop).result()
+                _shared_client, _shared_loop = client, loop
+            return _shared_client
+
+    @staticmethod
+    def close_shared():
+        """Close the shared client's session and stop its event loop; the next call opens new ones"""
+        global _shared_client, _shared_loop
+        with _shared_lock:
+            client, loop = _shared_client, _shared_loop
+            _shared_client = _shared_loop = None
+        if client is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(client.__aexit__(None, None, None), loop).result(timeout=10)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+atexit.register(AsyncMarketDataClient.close_shared)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 21:37:09 2026
+
+Pre-warming of the most requested tickers: request popularity is tracked in
+SQLite, and just after each close the hottest tickers' prices and indicators
+are refreshed so interactive runs find them in the local cache. Runs as a
+thread inside the Streamlit app or as a separate worker process:
+
+    python stock_prewarm.py            # loop: refresh after every close
+    python stock_prewarm.py --once     # refresh now and exit
+    python stock_prewarm.py --stats    # hottest tickers and hit rate
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from stock_calendar import MarketCalendar
+from stock_config import (CACHE_DIR, MARKET_SETTLE_SECONDS, PREWARM_BATCHES_PER_MINUTE,
+                          PREWARM_HALF_LIFE_DAYS, PREWARM_TOP_N)
+from stock_limits import TokenBucket
+from stock_utils import StockUtils
+
+
+class RequestTracker:
+    """Decayed request counts per (ticker, period) and the warm/cold outcome of each request
+
+    Lives in SQLite so the app and a separate worker process share it.
+    """
+
+    def __init__(self, path=None, half_life_days=PREWARM_HALF_LIFE_DAYS):
+        self.path = path or CACHE_DIR / 'prewarm.sqlite'
+        self.half_life = half_life_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        # Weight left of a request made `elapsed` seconds ago (SQLite builds may lack pow())
+        self._db.create_function(
+            'decay', 1, lambda elapsed: 0.5 ** (elapsed / self.half_life), deterministic=True
+        )
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS requests ("
+                " ticker TEXT NOT NULL, period TEXT NOT NULL, score REAL NOT NULL, updated_at REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (ticker, period))"
+            )
+            # Close (epoch seconds) whose settled bars were last pre-warmed, shared with worker processes
+            self._db.execute("CREATE TABLE IF NOT EXISTS warmed (id INTEGER PRIMARY KEY CHECK (id = 0), close REAL NOT NULL)")
+
+    def record(self, tickers, period, warm):
+        """Count one request for each ticker; `warm` are the ones whose data was already current"""
+        now = time.time()
+        warm = set(warm)
+        with self._lock, self._db:
+            for ticker in dict.fromkeys(tickers):
+                hit = ticker in warm
+                # Decay the old score to now, then add this request
+                self._db.execute(
+                    "INSERT INTO requests (ticker, period, score, updated_at, hits, misses) VALUES (?, ?, 1, ?, ?, ?)"
+                    " ON CONFLICT (ticker, period) DO UPDATE SET"
+                    " score = score * decay(excluded.updated_at - updated_at) + 1,"
+                    " updated_at = excluded.updated_at,"
+                    " hits = hits + excluded.hits, misses = misses + excluded.misses",
+                    (ticker, period, now, int(hit), int(not hit))
+                )
+
+    def hottest(self, limit=PREWARM_TOP_N):
+        """[(ticker, period)] with the highest current scores, most popular first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT ticker, period FROM requests"
+                " ORDER BY score * decay(? - updated_at) DESC LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        return [(ticker, period) for ticker, period in rows]
+
+    def warmed_close(self):
+        """The close (UTC datetime) whose settled data was last pre-warmed, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT close FROM warmed").fetchone()
+        return datetime.fromtimestamp(row[0], timezone.utc) if row else None
+
+    def mark_warmed(self, close):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO warmed (id, close) VALUES (0, ?)", (close.timestamp(),))
+
+    def stats(self):
+        with self._lock:
+            requests, hits = self._db.execute(
+                "SELECT COALESCE(SUM(hits + misses), 0), COALESCE(SUM(hits), 0) FROM requests"
+            ).fetchone()
+        return {'requests': requests, 'hits': hits, 'hit_rate': hits / requests if requests else 0.0}
+
+
+class PrewarmScheduler:
+    """Refreshes the hottest tickers just after each market close, within a download rate limit"""
+
+    # Tickers per price download; one download is one rate-limit token
+    BATCH_SIZE = 25
+    # Wait before retrying a run that failed, as the close stays unwarmed
+    RETRY_SECONDS = 15 * 60
+
+    def __init__(self, tracker, top_n=PREWARM_TOP_N, batches_per_minute=PREWARM_BATCHES_PER_MINUTE):
+        self.tracker = tracker
+        self.top_n = top_n
+        self.bucket = TokenBucket.per_minute(batches_per_minute, capacity=1)
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Refresh prices and indicators of the hottest tickers; returns a small report"""
+        started = time.monotonic()
+        now = MarketCalendar.now()
+        close = MarketCalendar.last_close(now)
+        hottest = self.tracker.hottest(self.top_n)
+        hot = set(hottest)
+        tickers = list(dict.fromkeys(ticker for ticker, _ in hottest))
+        periods = sorted({period for _, period in hot})
+
+        errors = {}
+        for i in range(0, len(tickers), self.BATCH_SIZE):
+            if self._stop.is_set():
+                break
+            batch = tickers[i:i + self.BATCH_SIZE]
+            self.bucket.acquire()
+            # Prices and indicators are shared by every period; the other periods
+            # only slice the stored history again
+            for period in periods:
+                _, batch_errors = StockUtils.collect_summaries(
+                    [ticker for ticker in batch if (ticker, period) in hot], period
+                )
+                errors.update(batch_errors)
+
+        # Only a complete run over settled bars counts as that close being warm
+        if not self._stop.is_set() and now >= close + timedelta(seconds=MARKET_SETTLE_SECONDS):
+            self.tracker.mark_warmed(close)
+        self.last_run = {
+            'tickers': len(tickers),
+            'failed': len(errors),
+            'seconds': round(time.monotonic() - started, 1),
+            'finished_at': MarketCalendar.now().isoformat()
+        }
+        return self.last_run
+
+    def next_run_at(self, now=None):
+        """Next close plus the settle delay, when that day's bars are final
+
+        Returns `now` when the last close has settled but was never warmed,
+        e.g. when the process starts after the close.
+        """
+        now = now or MarketCalendar.now()
+        settle = timedelta(seconds=MARKET_SETTLE_SECONDS)
+        close = MarketCalendar.last_close(now)
+        if now < close + settle:
+            return close + settle
+        if self.tracker.warmed_close() != close:
+            return now
+        return MarketCalendar.next_close(now) + settle
+
+    def start(self):
+        """Run in a daemon thread until stop(); returns immediately"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name='stock-prewarm', daemon=True)
+            self._thread.start()
+        return self
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            wait = (self.next_run_at() - MarketCalendar.now()).total_seconds()
+            if self._stop.wait(max(wait, 0)):
+                break
+            try:
+                self.run_once()
+            except Exception as e:
+                self.last_run = {'error': str(e), 'finished_at': MarketCalendar.now().isoformat()}
+                self._stop.wait(self.RETRY_SECONDS)
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """Hit rate of interactive requests, last run and next scheduled run"""
+        return {**self.tracker.stats(), 'last_run': self.last_run, 'next_run': self.next_run_at().isoformat()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm prices and indicators of the most requested tickers")
+    parser.add_argument('--once', action='store_true', help="Refresh now and exit")
+    parser.add_argument('--stats', action='store_true', help="Print the hottest tickers and the hit rate")
+    parser.add_argument('--top', type=int, default=PREWARM_TOP_N, help="Number of (ticker, period) pairs kept warm")
+    parser.add_argument('--batches-per-minute', type=float, default=PREWARM_BATCHES_PER_MINUTE,
+                        help="Maximum price downloads per minute")
+    args = parser.parse_args()
+
+    tracker = RequestTracker()
+    scheduler = PrewarmScheduler(tracker, args.top, args.batches_per_minute)
+    if args.stats:
+        print(f"Hottest: {', '.join(f'{ticker} {period}' for ticker, period in tracker.hottest(args.top))}")
+        print(f"Requests: {scheduler.status()}")
+    elif args.once:
+        print(scheduler.run_once())
+    else:
+        print(f"Next refresh at {scheduler.next_run_at().isoformat()}")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 13:21:09 2026
+
+Token-budgeted prompt payloads built from fetched stock data
+"""
+
+import numpy as np
+import pandas as pd
+
+from stock_records import TickerHistory
+
+# Rough size of one token for English text and numbers
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TOKEN_BUDGET = 400
+
+# (field, CSV header) in display order; fields later in the list are dropped first
+COLUMNS = [
+    ('ticker', 'ticker'),
+    ('current_price', 'price'),
+    ('price_change_pct', 'chg%'),
+    ('sector', 'sector'),
+    ('rsi_14', 'rsi14'),
+    ('macd_hist', 'macd_hist'),
+    ('bb_pct_b', 'bb%b'),
+    ('volatility_20', 'vol20%'),
+    ('ema_gap_pct', 'ema20v50%'),
+    ('atr_pct', 'atr%'),
+    ('max_drawdown_pct', 'maxdd%'),
+    ('sharpe', 'sharpe'),
+    ('market_cap', 'mcap_bn'),
+    ('pe_ratio', 'pe'),
+    ('dividend_yield', 'div_yield'),
+    ('period_high', 'hi'),
+    ('period_low', 'lo'),
+    ('bb_width', 'bb_width')
+]
+
+# Downsampled close series lengths tried, longest first, before columns are dropped
+SERIES_POINTS = (12, 6, 3, 0)
+
+
+class StockPrompts:
+    @staticmethod
+    def estimate_tokens(text):
+        """Cheap token estimate, good enough for budgeting prompts"""
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    @staticmethod
+    def build_payload(stock_data, token_budget=DEFAULT_TOKEN_BUDGET):
+        """Compact CSV summary of `stock_data` that fits in `token_budget` tokens
+
+        `stock_data` is either a list of StockSummary records (StockUtils.summarize_stocks)
+        or a dict of ticker -> TickerData (app.fetch_stock_data); plain dicts with the
+        same keys and a `history` DataFrame work too.
+        The size depends on the number of tickers, never on the history length.
+        """
+        records = StockPrompts._records(stock_data)
+        columns = [
+            (field, header) for field, header in COLUMNS
+            if any(record.get(field) is not None for record in records)
+        ]
+
+        rows = len(records)
+        points = list(SERIES_POINTS)
+        while True:
+            payload = StockPrompts._render(records[:rows], columns, points[0], len(records) - rows)
+            if StockPrompts.estimate_tokens(payload) <= token_budget:
+                return payload
+            # Shrink in order: series detail, least important columns, then tickers
+            if len(points) > 1:
+                points.pop(0)
+            elif len(columns) > 3:
+                columns.pop()
+            elif rows > 1:
+                rows -= 1
+            else:
+                return payload
+
+    @staticmethod
+    def _records(stock_data):
+        if isinstance(stock_data, dict):
+            stock_data = [dict(StockPrompts._as_dict(data), ticker=ticker) for ticker, data in stock_data.items()]
+
+        records = []
+        for stock in map(StockPrompts._as_dict, stock_data):
+            record = {key: value for key, value in stock.items() if key not in ('history', 'indicators')}
+            record.update(stock.get('indicators') or {})
+
+            history = stock.get('history')
+            if isinstance(history, pd.DataFrame):
+                history = {field: history[field].to_numpy(dtype='float64') for field in ('Close', 'High', 'Low')}
+            elif isinstance(history, TickerHistory):
+                history = {field: history.column(field).astype('float64') for field in ('Close', 'High', 'Low')}
+            close = history['Close'][~np.isnan(history['Close'])] if history else []
+            if len(close):
+                record.setdefault('price_change_pct', round((close[-1] / close[0] - 1) * 100, 2))
+                record['period_high'] = round(float(np.nanmax(history['High'])), 2)
+                record['period_low'] = round(float(np.nanmin(history['Low'])), 2)
+                record['closes'] = close
+            if record.get('market_cap'):
+                record['market_cap'] = round(record['market_cap'] / 1e9, 1)
+            records.append(record)
+        return records
+
+    @staticmethod
+    def _as_dict(stock):
+        return stock if isinstance(stock, dict) else stock.to_dict()
+
+    @staticmethod
+    def _render(records, columns, series_points, omitted):
+        lines = [",".join(header for _, header in columns)]
+        for record in records:
+            lines.append(",".join(StockPrompts._cell(record.get(field)) for field, _ in columns))
+        if omitted:
+            lines.append(f"(+{omitted} more tickers omitted)")
+
+        series = [record for record in records if record.get('closes') is not None]
+        if series_points and series:
+            lines.append(f"close rebased to 100, {series_points} evenly spaced points:")
+            for record in series:
+                closes = record['closes']
+                picks = closes[np.linspace(0, len(closes) - 1, min(series_points, len(closes))).round().astype(int)]
+                rebased = np.round(picks / picks[0] * 100).astype(int)
+                lines.append(f"{record['ticker']}:" + " ".join(map(str, rebased)))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return ""
+        if isinstance(value, float):
+            return f"{value:g}"
+        return str(value).replace(",", " ")
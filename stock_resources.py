@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 15:47:03 2026
+
+Long-lived resources reused across research runs: the LLM client, the agents
+and one keep-alive HTTP session for Yahoo and Wikipedia
+"""
+
+import hashlib
+import os
+import threading
+
+# Browser-like identity; Wikipedia rejects the default python user agents
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+# Sampling temperature of the research agents' Groq model
+LLM_TEMPERATURE = 0.7
+
+
+class StockResources:
+    """Process-wide LLM client and HTTP session, plus per-session agents"""
+
+    _lock = threading.Lock()
+    _session = None
+    _llm = None
+    _llm_fingerprint = None
+
+    @classmethod
+    def http_session(cls):
+        """Pooled keep-alive session shared by yfinance and the ticker scraper
+
+        yfinance needs a curl_cffi session to pass Yahoo's browser checks;
+        plain requests is the fallback when curl_cffi is not installed.
+        """
+        with cls._lock:
+            if cls._session is None:
+                try:
+                    from curl_cffi import requests as curl_requests
+                    cls._session = curl_requests.Session(impersonate="chrome")
+                except ImportError:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    cls._session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                    cls._session.mount("https://", adapter)
+                    cls._session.mount("http://", adapter)
+                cls._session.headers.update({"User-Agent": USER_AGENT})
+            return cls._session
+
+    @classmethod
+    def get_llm(cls, factory, api_key, model, temperature):
+        """LLM client built by `factory()`, rebuilt only when the key, model or temperature change"""
+        fingerprint = cls._fingerprint(api_key, model, temperature)
+        with cls._lock:
+            if cls._llm is None or cls._llm_fingerprint != fingerprint:
+                cls._llm, cls._llm_fingerprint = factory(), fingerprint
+            return cls._llm
+
+    @staticmethod
+    def model_name():
+        return os.getenv("GROQ_MODEL", "groq/llama-3.1-70b-versatile")
+
+    @classmethod
+    def groq_llm(cls):
+        """Groq client shared across runs; rebuilt when the API key or model changes"""
+        return cls.get_llm(cls._build_groq_llm, os.getenv("GROQ_API_KEY"), cls.model_name(), LLM_TEMPERATURE)
+
+    @classmethod
+    def _build_groq_llm(cls):
+        # Imported here, so modules that never call the LLM don't load the agent stack
+        import litellm
+        from langchain_groq import ChatGroq
+
+        litellm.set_verbose = False
+        litellm.api_key = os.getenv("GROQ_API_KEY")
+        return ChatGroq(
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            model=cls.model_name(),
+            temperature=LLM_TEMPERATURE
+        )
+
+    @staticmethod
+    def get_agents(store, llm, factory):
+        """Agents built by `factory(llm)`, kept in `store` (e.g. st.session_state)
+
+        crewai agents keep per-run executor state, so they are cached per
+        session rather than shared by concurrent users. They are rebuilt
+        whenever the LLM client behind them changes.
+        """
+        if store.get('_agents_llm') is not llm:
+            store['_agents'] = factory(llm)
+            store['_agents_llm'] = llm
+        return store['_agents']
+
+    @classmethod
+    def invalidate(cls):
+        """Drop every cached resource; the next request builds fresh ones"""
+        with cls._lock:
+            if cls._session is not None:
+                cls._session.close()
+            cls._session = None
+            cls._llm = None
+            cls._llm_fingerprint = None
+
+    @staticmethod
+    def _fingerprint(*parts):
+        # Only a digest is kept, never the API key itself
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
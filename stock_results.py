@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 03:21:44 2026
+
+Research result store: every run's inputs, indicator snapshot, agent outputs,
+token usage and timings in SQLite, indexed by ticker, date, sector and agent
+role, with a full-text index over the outputs. Prior reports load without a
+new LLM run, and history can be queried from the app or the command line:
+
+    python stock_results.py --ticker NVDA --role "Trading Strategist" --since 3mo
+    python stock_results.py --text "breakout" --sector "Information Technology"
+    python stock_results.py --show 42
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from stock_config import CACHE_DIR
+from stock_store import PriceStore
+
+# Role of the per-ticker analyses (stock_units), stored one output per ticker
+UNIT_ROLE = "Per-stock analysis"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " id INTEGER PRIMARY KEY, created_at REAL NOT NULL, run_date TEXT NOT NULL, source TEXT NOT NULL,"
+    " period TEXT NOT NULL, model TEXT, selection TEXT NOT NULL, inputs TEXT NOT NULL, timings TEXT NOT NULL,"
+    " seconds REAL, prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS runs_date ON runs (run_date)",
+    "CREATE INDEX IF NOT EXISTS runs_selection ON runs (selection, period, created_at)",
+    "CREATE TABLE IF NOT EXISTS run_stocks ("
+    " run_id INTEGER NOT NULL, ticker TEXT NOT NULL, sector TEXT, run_date TEXT NOT NULL, figures TEXT NOT NULL,"
+    " PRIMARY KEY (run_id, ticker))",
+    "CREATE INDEX IF NOT EXISTS run_stocks_ticker ON run_stocks (ticker, run_date)",
+    "CREATE INDEX IF NOT EXISTS run_stocks_sector ON run_stocks (sector, run_date)",
+    "CREATE TABLE IF NOT EXISTS outputs ("
+    " id INTEGER PRIMARY KEY, run_id INTEGER NOT NULL, role TEXT NOT NULL COLLATE NOCASE, ticker TEXT,"
+    " task TEXT, output TEXT NOT NULL, prompt_tokens INTEGER, completion_tokens INTEGER, cached INTEGER,"
+    " seconds REAL)",
+    "CREATE INDEX IF NOT EXISTS outputs_role ON outputs (role, run_id)",
+    "CREATE INDEX IF NOT EXISTS outputs_run ON outputs (run_id)"
+)
+
+
+class ResultStore:
+    """Saved research runs; safe to share between threads, and between processes through SQLite"""
+
+    def __init__(self, path=None):
+        self.path = path or CACHE_DIR / 'research_results.sqlite'
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            # The app and batch runs may write while another process reads
+            self._db.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                self._db.execute(statement)
+            try:
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS outputs_fts USING fts5(output, role, ticker)")
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: text queries fall back to LIKE
+                self.fts = False
+
+    def save(self, source, tickers, period, stocks=(), outputs=(), model=None, tracer=None, inputs=None):
+        """Store one run and return its id
+
+        `stocks` are StockSummary-like records (ticker, optional sector and
+        figures), `outputs` dicts with role, output and optionally task,
+        ticker and span_id. Token counts and timings come from the run's
+        Tracer: an output gets the counts of the span it was produced on, a
+        per-stock unit its share of the gateway call that answered it.
+        """
+        now = time.time()
+        run_date = datetime.fromtimestamp(now, timezone.utc).date().isoformat()
+        calls = [call for call in (tracer.llm_calls() if tracer is not None else []) if 'prompt_tokens' in call]
+        by_span = {call['span_id']: call for call in calls}
+        by_item = {}
+        for call in calls:
+            # A batched call answered several items; a later single call for an item it skipped wins
+            for item in call.get('items', ()):
+                share = len(call['items'])
+                by_item[item] = {**call, 'prompt_tokens': round(call['prompt_tokens'] / share),
+                                 'completion_tokens': round(call['completion_tokens'] / share)}
+        timings = tracer.breakdown() if tracer is not None else []
+        seconds = None
+        if tracer is not None and tracer.spans:
+            seconds = round(max(span.start + span.duration for span in tracer.spans)
+                            - min(span.start for span in tracer.spans), 3)
+        prompt_tokens = sum(call['prompt_tokens'] for call in calls)
+        completion_tokens = sum(call.get('completion_tokens', 0) for call in calls)
+
+        with self._lock, self._db:
+            run_id = self._db.execute(
+                "INSERT INTO runs (created_at, run_date, source, period, model, selection, inputs, timings,"
+                " seconds, prompt_tokens, completion_tokens) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (now, run_date, source, period, model, self.selection(tickers),
+                 self._json({'tickers': list(tickers), 'period': period, **(inputs or {})}),
+                 self._json(timings), seconds, prompt_tokens, completion_tokens)
+            ).lastrowid
+            self._db.executemany(
+                "INSERT OR REPLACE INTO run_stocks (run_id, ticker, sector, run_date, figures) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, stock.ticker, getattr(stock, 'sector', None), run_date, self._json(self._figures(stock)))
+                 for stock in stocks]
+            )
+            for output in outputs:
+                call = by_span.get(output.get('span_id')) or by_item.get(output.get('ticker')) or {}
+                output_id = self._db.execute(
+                    "INSERT INTO outputs (run_id, role, ticker, task, output, prompt_tokens, completion_tokens,"
+                    " cached, seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, output['role'], output.get('ticker'), output.get('task'), output['output'],
+                     call.get('prompt_tokens'), call.get('completion_tokens'), call.get('cached'),
+                     call.get('seconds'))
+                ).lastrowid
+                if self.fts:
+                    self._db.execute(
+                        "INSERT INTO outputs_fts (rowid, output, role, ticker) VALUES (?, ?, ?, ?)",
+                        (output_id, output['output'], output['role'], output.get('ticker') or "")
+                    )
+        return run_id
+
+    @staticmethod
+    def crew_outputs(results, crew=None):
+        """Output dicts of a crew's task results; with the StockCrew, each carries its call's span id"""
+        if crew is not None:
+            span_ids = [crew.span_ids.get(id(task)) for task in crew.tasks]
+        else:
+            span_ids = [None] * len(results.tasks_output)
+        return [
+            {'role': output.agent, 'task': output.description, 'output': output.raw, 'span_id': span_id}
+            for output, span_id in zip(results.tasks_output, span_ids)
+        ]
+
+    @staticmethod
+    def unit_outputs(units):
+        """Output dicts of ticker -> per-stock analysis text"""
+        return [{'role': UNIT_ROLE, 'ticker': ticker, 'output': text} for ticker, text in units.items()]
+
+    @staticmethod
+    def selection(tickers):
+        """Order-independent key of a ticker selection"""
+        return ",".join(sorted(set(tickers)))
+
+    def latest(self, tickers, period, since=None):
+        """Id of the newest run over exactly these tickers and period, or None"""
+        query = "SELECT id FROM runs WHERE selection = ? AND period = ?"
+        params = [self.selection(tickers), period]
+        if since is not None:
+            query += " AND run_date >= ?"
+            params.append(self._since(since))
+        with self._lock:
+            row = self._db.execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        return row['id'] if row else None
+
+    def runs(self, ticker=None, limit=20):
+        """Newest runs first, optionally only those covering `ticker`"""
+        query = ("SELECT id, created_at, run_date, source, period, model, selection AS tickers, seconds,"
+                 " prompt_tokens, completion_tokens FROM runs")
+        params = []
+        if ticker:
+            query += " WHERE id IN (SELECT run_id FROM run_stocks WHERE ticker = ?)"
+            params.append(ticker)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created_at DESC LIMIT ?", [*params, limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def load(self, run_id):
+        """One run with its inputs, timings, stock figures and outputs, or None"""
+        with self._lock:
+            run = self._db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if run is None:
+                return None
+            stocks = self._db.execute(
+                "SELECT ticker, sector, figures FROM run_stocks WHERE run_id = ?", (run_id,)
+            ).fetchall()
+            outputs = self._db.execute(
+                "SELECT role, ticker, task, output, prompt_tokens, completion_tokens, cached, seconds"
+                " FROM outputs WHERE run_id = ? ORDER BY id", (run_id,)
+            ).fetchall()
+        run = dict(run)
+        run['inputs'], run['timings'] = json.loads(run['inputs']), json.loads(run['timings'])
+        order = {ticker: i for i, ticker in enumerate(run['inputs'].get('tickers', []))}
+        run['stocks'] = sorted(
+            ({'ticker': row['ticker'], 'sector': row['sector'], **json.loads(row['figures'])} for row in stocks),
+            key=lambda stock: order.get(stock['ticker'], len(order))
+        )
+        run['outputs'] = [dict(row) for row in outputs]
+        return run
+
+    def search(self, text=None, ticker=None, role=None, sector=None, since=None, until=None, limit=50):
+        """Matching outputs, newest first, as a DataFrame
+
+        `since` and `until` take dates or a period back from today such as
+        '3mo'; `text` matches words of the output (all of them, in any order).
+        """
+        query = ("SELECT o.run_id, r.run_date, r.period, r.selection AS tickers, o.role, o.ticker, o.output"
+                 " FROM outputs o JOIN runs r ON r.id = o.run_id WHERE 1 = 1")
+        params = []
+        if ticker:
+            # The run covered the ticker; per-ticker outputs must be that ticker's own
+            query += (" AND o.run_id IN (SELECT run_id FROM run_stocks WHERE ticker = ?)"
+                      " AND (o.ticker IS NULL OR o.ticker = ?)")
+            params += [ticker, ticker]
+        if sector:
+            query += (" AND o.run_id IN (SELECT run_id FROM run_stocks WHERE sector = ?)"
+                      " AND (o.ticker IS NULL OR EXISTS (SELECT 1 FROM run_stocks s"
+                      " WHERE s.run_id = o.run_id AND s.ticker = o.ticker AND s.sector = ?))")
+            params += [sector, sector]
+        if role:
+            query += " AND o.role = ?"
+            params.append(role)
+        if since is not None:
+            query += " AND r.run_date >= ?"
+            params.append(self._since(since))
+        if until is not None:
+            query += " AND r.run_date <= ?"
+            params.append(self._since(until))
+        if text and text.strip():
+            if self.fts:
+                # Every word quoted, so punctuation in the query is not FTS syntax
+                words = " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+                query += " AND o.id IN (SELECT rowid FROM outputs_fts WHERE outputs_fts MATCH ?)"
+                params.append(words)
+            else:
+                for word in text.split():
+                    query += " AND o.output LIKE ?"
+                    params.append(f"%{word}%")
+
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY r.created_at DESC, o.id LIMIT ?", [*params, limit]).fetchall()
+        return pd.DataFrame([dict(row) for row in rows],
+                            columns=['run_id', 'run_date', 'period', 'tickers', 'role', 'ticker', 'output'])
+
+    def roles(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT role FROM outputs ORDER BY role")]
+
+    def stats(self):
+        """Stored runs and the tokens and seconds they took"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(prompt_tokens + completion_tokens), 0), COALESCE(SUM(seconds), 0)"
+                " FROM runs"
+            ).fetchone()
+        return {'runs': row[0], 'tokens': row[1], 'seconds': round(row[2], 1)}
+
+    @staticmethod
+    def _since(value):
+        """ISO date of a date-like value or of a period ('3mo', '1y', 'ytd') back from today"""
+        if isinstance(value, str) and (value == 'ytd' or value[:1].isdigit() and value[-1:].isalpha()):
+            today = pd.Timestamp(datetime.now(timezone.utc).date())
+            return PriceStore.period_start(today, value).date().isoformat()
+        return pd.Timestamp(value).date().isoformat()
+
+    @staticmethod
+    def _figures(stock):
+        """Everything of a stock record except its ticker, sector and price history"""
+        values = stock.to_dict() if hasattr(stock, 'to_dict') else dict(stock)
+        return {key: value for key, value in values.items() if key not in ('ticker', 'sector', 'history')}
+
+    @staticmethod
+    def _json(value):
+        # NumPy scalars are stored as plain numbers
+        return json.dumps(value, default=lambda item: item.item() if hasattr(item, 'item') else str(item))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query saved research runs")
+    parser.add_argument('--text', help="Words the output must contain")
+    parser.add_argument('--ticker', help="Runs covering this ticker")
+    parser.add_argument('--role', help="Agent role, e.g. 'Trading Strategist'")
+    parser.add_argument('--sector', help="GICS sector of the stocks")
+    parser.add_argument('--since', help="Date or period back from today, e.g. 3mo")
+    parser.add_argument('--until', help="Latest run date")
+    parser.add_argument('--limit', type=int, default=20, help="Most outputs listed")
+    parser.add_argument('--show', type=int, metavar='RUN_ID', help="Print one run in full")
+    args = parser.parse_args()
+
+    store = ResultStore()
+    if args.show is not None:
+        run = store.load(args.show)
+        if run is None:
+            raise SystemExit(f"No run {args.show}")
+        print(f"Run {run['id']} on {run['run_date']} ({run['source']}, {run['period']}, {run['model']}): "
+              f"{run['prompt_tokens']} prompt + {run['completion_tokens']} completion tokens, {run['seconds']}s")
+        for output in run['outputs']:
+            print(f"\n--- {output['role']}{' ' + output['ticker'] if output['ticker'] else ''} ---\n{output['output']}")
+        return
+
+    started = time.perf_counter()
+    results = store.search(args.text, args.ticker, args.role, args.sector, args.since, args.until, args.limit)
+    elapsed = time.perf_counter() - started
+    for row in results.itertuples():
+        excerpt = " ".join(row.output.split())[:100]
+        print(f"#{row.run_id} {row.run_date} {row.tickers} | {row.role}{' ' + row.ticker if row.ticker else ''}: {excerpt}")
+    print(f"{len(results)} outputs in {elapsed * 1000:.1f} ms; {store.stats()['runs']} runs stored")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 00:41:58 2026
+
+Universe screener: scores every constituent on momentum, volatility, RSI
+extremes and sector-relative return with array operations over the local
+price store, so only the top-ranked names reach the agents
+"""
+
+import numpy as np
+import pandas as pd
+
+from stock_config import SCREENER_LOOKBACK_DAYS, SCREENER_TOP_N
+from stock_indicators import TRADING_DAYS, StockIndicators
+from stock_tracing import Tracer
+
+# Criterion -> default weight; scores are z-scores across the universe, so a
+# negative weight favours low values (calm stocks for volatility)
+CRITERIA = {
+    'momentum': 1.0,
+    'volatility': -0.5,
+    'rsi_extreme': 0.5,
+    'sector_relative': 1.0
+}
+
+RSI_WINDOW = 14
+VOLATILITY_WINDOW = 20
+
+
+class StockScreener:
+    """Ranks tickers on weighted price criteria"""
+
+    # Stored history loaded for scoring; covers the lookback and the RSI warm-up
+    PERIOD = '1y'
+
+    def __init__(self, weights=None, lookback_days=SCREENER_LOOKBACK_DAYS):
+        weights = dict(CRITERIA if weights is None else weights)
+        unknown = set(weights) - set(CRITERIA)
+        if unknown:
+            raise ValueError(f"Unknown screening criteria: {', '.join(sorted(unknown))}")
+        self.weights = weights
+        self.lookback_days = lookback_days
+
+    def screen(self, store, tickers, sectors, refresh=True):
+        """Every ticker with stored prices, best score first
+
+        `store` is a PriceStore and `sectors` a ticker -> sector dict.
+        """
+        with Tracer.span('screen_load', tickers=len(tickers)):
+            histories = store.get_histories(tickers, self.PERIOD, refresh)
+        with Tracer.span('screen_rank', tickers=len(histories)):
+            return self.rank(histories, sectors)
+
+    def rank(self, histories, sectors):
+        """Criteria, weighted score and rank per ticker of a PriceHistories"""
+        if not len(histories) or not len(histories.dates):
+            return pd.DataFrame(columns=['sector', 'price', *CRITERIA, 'rsi_14', 'score', 'rank'])
+        close = self._ffill(histories.values[:, histories.fields.index('Close')]).astype('float64')
+        sector = np.array([sectors.get(ticker, 'N/A') for ticker in histories.tickers], dtype=object)
+
+        momentum = self._momentum(close, self.lookback_days)
+        rsi = self._rsi(close, RSI_WINDOW)
+        table = pd.DataFrame({
+            'sector': sector,
+            'price': close[:, -1],
+            'momentum': momentum,
+            'volatility': self._volatility(close, VOLATILITY_WINDOW),
+            'rsi_14': rsi,
+            'rsi_extreme': np.abs(rsi - 50),
+            'sector_relative': momentum - self._sector_median(momentum, sector)
+        }, index=pd.Index(histories.tickers, name='ticker'))
+
+        score = np.zeros(len(table))
+        for criterion, weight in self.weights.items():
+            if weight:
+                score += weight * self._zscore(table[criterion].to_numpy(dtype='float64'))
+        table['score'] = score
+        table = table.sort_values('score', ascending=False)
+        table['rank'] = np.arange(1, len(table) + 1)
+        return table.round(2)
+
+    @staticmethod
+    def top(ranking, n=SCREENER_TOP_N):
+        """Tickers of the `n` best-ranked rows"""
+        return list(ranking.index[:n])
+
+    @staticmethod
+    def _ffill(values):
+        """Forward-fill NaN gaps along the date axis of a (tickers, dates) array"""
+        valid = ~np.isnan(values)
+        index = np.where(valid, np.arange(values.shape[1]), 0)
+        np.maximum.accumulate(index, axis=1, out=index)
+        return values[np.arange(values.shape[0])[:, None], index]
+
+    @staticmethod
+    def _momentum(close, days):
+        """Percent return over the last `days` bars; NaN without a full window"""
+        if close.shape[1] <= days:
+            return np.full(close.shape[0], np.nan)
+        return (close[:, -1] / close[:, -days - 1] - 1) * 100
+
+    @staticmethod
+    def _volatility(close, window):
+        """Annualized volatility of the last `window` daily log returns, in percent"""
+        if close.shape[1] <= window:
+            return np.full(close.shape[0], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(np.log(close[:, -window - 1:]), axis=1)
+        return np.nanstd(returns, axis=1, ddof=1) * np.sqrt(TRADING_DAYS) * 100
+
+    @staticmethod
+    def _rsi(close, window):
+        """StockIndicators.rsi of the last bar, for every ticker of a (tickers, dates) array at once"""
+        return StockIndicators.rsi(pd.DataFrame(close.T), window).iloc[-1].to_numpy(dtype='float64')
+
+    @staticmethod
+    def _sector_median(values, sector):
+        medians = np.full(len(values), np.nan)
+        for name in np.unique(sector):
+            members = sector == name
+            if np.isfinite(values[members]).any():
+                medians[members] = np.nanmedian(values[members])
+        return medians
+
+    @staticmethod
+    def _zscore(values):
+        """Standardized values; missing ones score 0 (the universe average)"""
+        finite = np.isfinite(values)
+        if finite.sum() < 2:
+            return np.zeros(len(values))
+        std = values[finite].std()
+        scores = (values - values[finite].mean()) / std if std else np.zeros(len(values))
+        return np.where(finite, scores, 0.0)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 11:15:48 2026
+
+Local columnar price store: one uncompressed Feather file per ticker,
+read through memory maps and topped up incrementally from Yahoo
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from stock_calendar import MarketCalendar
+from stock_config import CACHE_DIR, PRICE_REFRESH_SECONDS, PRICE_STORE_PERIOD
+from stock_records import PriceHistories
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Relative change of an already stored close beyond which the provider has
+# re-adjusted the history (split, dividend) and the stored bars are replaced
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+class PriceStore:
+    """Per-ticker OHLCV history kept on disk and sliced locally by period
+
+    `downloader(tickers, period=..., start=...)` must return a batch frame
+    keyed by (ticker, field), as StockUtils.download_history does.
+    """
+
+    def __init__(self, downloader, root=None, base_period=PRICE_STORE_PERIOD,
+                 refresh_seconds=PRICE_REFRESH_SECONDS):
+        self.downloader = downloader
+        self.root = root or CACHE_DIR / 'prices'
+        self.base_period = base_period
+        self.refresh_seconds = refresh_seconds
+        self.errors = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_history(self, tickers, period='1mo', refresh=True):
+        """Batch frame keyed by (ticker, field) covering `period`, served from local files"""
+        tickers = list(dict.fromkeys(tickers))
+        if refresh:
+            self.update(tickers)
+
+        frames = {}
+        for ticker in tickers:
+            bars = self.read(ticker)
+            if bars is not None and not bars.empty:
+                frames[ticker] = self.slice_period(bars, period)
+        if not frames:
+            return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=['Ticker', 'Price']))
+        return pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+
+    def get_histories(self, tickers, period='1y', refresh=True):
+        """PriceHistories of the tickers over `period`, built straight from the Feather columns
+
+        Skips the per-ticker DataFrames of get_history, which dominate the
+        load time of a whole index; tickers never stored are left out.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if refresh:
+            self.update(tickers)
+
+        stored = {}
+        for ticker in tickers:
+            path = self._path(ticker)
+            if path.exists():
+                table = feather.read_table(path, memory_map=True)
+                stored[ticker] = (table.column('Date').to_numpy(), [table.column(field).to_numpy() for field in FIELDS])
+        if not stored:
+            return PriceHistories([], pd.DatetimeIndex([]), np.empty((0, len(FIELDS), 0)), FIELDS)
+
+        dates = np.unique(np.concatenate([bar_dates for bar_dates, _ in stored.values()]))
+        if period != 'max':
+            dates = dates[dates > self.period_start(pd.Timestamp(dates[-1]), period).to_datetime64()]
+        values = np.full((len(stored), len(FIELDS), len(dates)), np.nan, dtype=np.float32)
+        for row, (bar_dates, columns) in enumerate(stored.values()):
+            keep = bar_dates >= dates[0]
+            values[row][:, np.searchsorted(dates, bar_dates[keep])] = np.vstack(columns)[:, keep]
+        return PriceHistories(list(stored), dates, values, FIELDS)
+
+    def update(self, tickers):
+        """Bring every ticker up to date, downloading only the bars after the last stored one"""
+        missing, stale = [], {}
+        for ticker in dict.fromkeys(tickers):
+            if not self._path(ticker).exists():
+                missing.append(ticker)
+            elif not self.is_fresh(ticker):
+                # Overlap a completed stored bar, so a changed adjustment shows up
+                dates = self.read(ticker).index
+                overlap = dates[-2] if len(dates) > 1 else dates[-1]
+                stale.setdefault(overlap.date().isoformat(), []).append(ticker)
+            else:
+                self.hits += 1
+
+        if missing:
+            self.misses += len(missing)
+            self._download_and_merge(missing, period=self.base_period)
+        rebased = {}
+        for start, group in stale.items():
+            self.misses += len(group)
+            # The last stored day is downloaded again, so a partial bar from that session is replaced
+            for ticker in self._download_and_merge(group, check=pd.Timestamp(start), start=start):
+                first_bar = self.read(ticker).index.min()
+                rebased.setdefault(first_bar.date().isoformat(), []).append(ticker)
+        for start, group in rebased.items():
+            # Split or dividend since the bars were stored: the whole history moves to the new basis
+            self._download_and_merge(group, replace=True, start=start)
+
+    def is_fresh(self, ticker):
+        """Stored bars are current: checked within `refresh_seconds`, or after the
+        last close with the market still closed"""
+        try:
+            checked_at = self._path(ticker).stat().st_mtime
+        except OSError:
+            return False
+        return time.time() - checked_at < self.refresh_seconds or MarketCalendar.settled_since(checked_at)
+
+    def read(self, ticker):
+        """OHLCV frame of one ticker, or None if it has never been stored"""
+        path = self._path(ticker)
+        if not path.exists():
+            return None
+        table = feather.read_table(path, memory_map=True)
+        return table.to_pandas(split_blocks=True).set_index('Date')
+
+    @staticmethod
+    def slice_period(bars, period):
+        """Last `period` ('5d', '1mo', '6mo', '1y', 'ytd', 'max') of a date-indexed frame"""
+        if bars.empty or period == 'max':
+            return bars
+        return bars.loc[bars.index > PriceStore.period_start(bars.index.max(), period)]
+
+    @staticmethod
+    def period_start(end, period):
+        """Date after which the bars of a `period` ending on `end` start"""
+        if period == 'ytd':
+            return pd.Timestamp(year=end.year, month=1, day=1)
+        units = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+        count = int(period.rstrip('dwkmoy'))
+        return end - pd.DateOffset(**{units[period[len(str(count)):]]: count})
+
+    def _download_and_merge(self, tickers, check=None, replace=False, **window):
+        """Download and store the tickers' bars; returns the tickers left unwritten because
+        their close on the `check` date no longer matches the stored one"""
+        try:
+            history = self.downloader(tickers, **window)
+        except Exception as e:
+            for ticker in tickers:
+                self.errors[ticker] = e
+            return []
+
+        rebased = []
+        available = set(history.columns.get_level_values('Ticker'))
+        # Downloaders may explain missing tickers in attrs['errors']
+        failures = history.attrs.pop('errors', {})
+        for ticker in tickers:
+            if ticker not in available:
+                if ticker in failures:
+                    # Stored bars are still served; the next request retries
+                    self.errors[ticker] = failures[ticker]
+                elif not self._path(ticker).exists():
+                    self.errors[ticker] = LookupError("no price history returned")
+                else:
+                    # Nothing new yet (e.g. before the open): mark as checked
+                    os.utime(self._path(ticker))
+                continue
+            bars = history[ticker].dropna(how='all')
+            if check is not None and not self._same_basis(self.read(ticker), bars, check):
+                rebased.append(ticker)
+                continue
+            self.errors.pop(ticker, None)
+            self._write(ticker, bars, replace)
+        return rebased
+
+    @staticmethod
+    def _same_basis(stored, fresh, date):
+        """True unless the close of `date` differs between the stored and freshly downloaded bars"""
+        if stored is None or date not in stored.index or date not in fresh.index:
+            return True
+        old, new = stored.at[date, 'Close'], fresh.at[date, 'Close']
+        if not (np.isfinite(old) and np.isfinite(new)) or old == 0:
+            return True
+        return abs(new / old - 1) <= ADJUSTMENT_TOLERANCE
+
+    def _write(self, ticker, new_bars, replace=False):
+        new_bars = new_bars.reindex(columns=FIELDS)
+        with self._lock:
+            bars = None if replace else self.read(ticker)
+            if bars is not None:
+                new_bars = pd.concat([bars, new_bars])
+                new_bars = new_bars[~new_bars.index.duplicated(keep='last')]
+            new_bars = new_bars.sort_index().astype('float64')
+            new_bars.index.name = 'Date'
+
+            self.root.mkdir(parents=True, exist_ok=True)
+            path = self._path(ticker)
+            tmp_path = path.with_suffix('.tmp')
+            feather.write_feather(new_bars.reset_index(), tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+
+    def _path(self, ticker):
+        return self.root / f"{ticker.replace('/', '_')}.feather"
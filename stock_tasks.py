@@ -7,33 +7,44 @@ Created on Mon Dec  2 15:29:26 2024
 
 from crewai import Task
 
+from stock_prompts import DEFAULT_TOKEN_BUDGET, StockPrompts
+from stock_units import StockAnalysisUnits
+
 class StockTasks:
     @staticmethod
-    def create_tasks(agents, stock_data):
-        """Create tasks for stock research"""
-        # Minimal stock summary string
-        stock_summary = " | ".join([
-            f"{stock['ticker']}(Price:${stock['current_price']},Change:{stock['price_change_pct']}%,Sector:{stock['sector']})" 
-            for stock in stock_data
-        ])
+    def create_tasks(agents, stock_data, token_budget=DEFAULT_TOKEN_BUDGET, cross_stock="", units=None):
+        """Create tasks for stock research
+
+        `cross_stock` is the text from StockCorrelation.to_prompt, if available.
+        With `units` (StockAnalysisUnits.analyze), the tasks synthesize those
+        per-ticker analyses instead of reading the raw figures.
+        """
+        if units:
+            stock_summary = f"Per-stock analyses:\n{StockAnalysisUnits.to_prompt(units)}"
+        else:
+            # Compact stock summary, bounded by the token budget
+            stock_summary = StockPrompts.build_payload(stock_data, token_budget)
+        market_data = f"{stock_summary}\n{cross_stock}" if cross_stock else stock_summary
 
         return [
             Task(
                 description=f"""
-                Analyze these stocks: {stock_summary}
+                Analyze these stocks:
+                {market_data}
                 
                 Provide a hyper-concise report:
                 - Key market trends
-                - Cross-stock performance comparison
+                - Cross-stock performance comparison (use the correlations and sector-relative figures)
                 - Critical insights
-                - Display graphs like RSI,Bollinger bands etc
+                - Read RSI, Bollinger bands, MACD, ATR, EMA trend and volatility from the figures given
                 """,
                 expected_output="Ultra-Concise Market Analysis (max 100 words)",
                 agent=agents[0]
             ),
             Task(
                 description=f"""
-                Develop trading strategy for: {stock_summary}
+                Develop trading strategy for:
+                {stock_summary}
                 
                 Deliver:
                 - Immediate trading opportunities
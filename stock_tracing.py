@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 19:48:06 2026
+
+Lightweight tracing of a research run: nested timed spans per stage,
+a per-stage breakdown and export as Chrome trace or OpenTelemetry JSON
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Tracer of the current run and the innermost open span; both follow the
+# code into worker threads started through Tracer.bind
+_active_tracer = contextvars.ContextVar('stock_tracer', default=None)
+_open_span = contextvars.ContextVar('stock_span', default=None)
+
+_span_ids = itertools.count(1)
+
+EXPORT_FORMATS = ('chrome', 'otel')
+
+
+class Span:
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        self.attributes = dict(attributes)
+        self.start = time.perf_counter()
+        self.end = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class _DisabledSpan:
+    """Stand-in yielded when no tracer is active, so call sites need no checks"""
+
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+
+_DISABLED = _DisabledSpan()
+
+
+class Tracer:
+    """Collects the spans opened while it is active"""
+
+    def __init__(self, service='stock-research'):
+        self.service = service
+        self.spans = []
+        self.trace_id = os.urandom(16).hex()
+        # Spans are timed with perf_counter and mapped to wall time on export
+        self._wall_origin = time.time()
+        self._perf_origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        token = _active_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _active_tracer.reset(token)
+
+    @staticmethod
+    def current():
+        return _active_tracer.get()
+
+    @staticmethod
+    @contextmanager
+    def span(name, **attributes):
+        """Time a block as a child of the open span; a no-op when no tracer is active"""
+        tracer = _active_tracer.get()
+        if tracer is None:
+            yield _DISABLED
+            return
+
+        span = Span(name, _open_span.get(), attributes)
+        token = _open_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=repr(e))
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _open_span.reset(token)
+            with tracer._lock:
+                tracer.spans.append(span)
+
+    @staticmethod
+    def bind(func):
+        """`func` running in the caller's tracing context, for thread pools and threads"""
+        context = contextvars.copy_context()
+
+        def run(*args, **kwargs):
+            # One copy per call: a context cannot be entered by two threads at once
+            return context.copy().run(func, *args, **kwargs)
+        return run
+
+    def breakdown(self):
+        """One row per span name: calls, total and slowest duration, in order of first start"""
+        stages = {}
+        for span in sorted(self.spans, key=lambda span: span.start):
+            stage = stages.setdefault(span.name, {'stage': span.name, 'calls': 0, 'total_s': 0.0, 'max_s': 0.0})
+            stage['calls'] += 1
+            stage['total_s'] += span.duration
+            stage['max_s'] = max(stage['max_s'], span.duration)
+        for stage in stages.values():
+            stage['total_s'] = round(stage['total_s'], 3)
+            stage['max_s'] = round(stage['max_s'], 3)
+        return list(stages.values())
+
+    def llm_calls(self):
+        """Duration, token counts and prompt/response sizes of every LLM span"""
+        return [
+            {'call': span.name, 'span_id': span.span_id, 'seconds': round(span.duration, 3), **span.attributes}
+            for span in sorted(self.spans, key=lambda span: span.start) if span.name.startswith('llm')
+        ]
+
+    def report(self):
+        """Plain-text breakdown for terminals"""
+        lines = [f"{'stage':<32}{'calls':>6}{'total s':>10}{'max s':>10}"]
+        lines += [
+            f"{stage['stage']:<32}{stage['calls']:>6}{stage['total_s']:>10.3f}{stage['max_s']:>10.3f}"
+            for stage in self.breakdown()
+        ]
+        for call in self.llm_calls():
+            details = ", ".join(f"{key}={value}" for key, value in call.items()
+                                if key not in ('call', 'span_id', 'seconds'))
+            lines.append(f"  {call['call']}: {call['seconds']:.3f}s ({details})")
+        return "\n".join(lines)
+
+    def export(self, path, fmt='chrome'):
+        """Write the spans to `path` as a Chrome trace (chrome://tracing, Perfetto) or OTLP JSON"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown trace format: {fmt}; expected one of {', '.join(EXPORT_FORMATS)}")
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        document = self.to_chrome_trace() if fmt == 'chrome' else self.to_otel_json()
+        path.write_text(json.dumps(document, default=str), encoding='utf-8')
+        return path
+
+    def to_chrome_trace(self):
+        events = [
+            {
+                'name': span.name,
+                'ph': 'X',
+                'ts': round((span.start - self._perf_origin) * 1e6),
+                'dur': round(span.duration * 1e6),
+                'pid': os.getpid(),
+                'tid': span.thread_id,
+                'args': span.attributes
+            }
+            for span in self.spans
+        ]
+        threads = {span.thread_id: span.thread_name for span in self.spans}
+        events += [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for tid, name in threads.items()
+        ]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def to_otel_json(self):
+        """Spans in the OTLP/JSON layout the OpenTelemetry collector's file receiver reads"""
+        spans = []
+        for span in self.spans:
+            record = {
+                'traceId': self.trace_id,
+                'spanId': f"{span.span_id:016x}",
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(self._unix_nanos(span.start)),
+                'endTimeUnixNano': str(self._unix_nanos(span.start + span.duration)),
+                'attributes': [self._otel_attribute(key, value) for key, value in span.attributes.items()]
+            }
+            if span.parent_id is not None:
+                record['parentSpanId'] = f"{span.parent_id:016x}"
+            spans.append(record)
+        return {'resourceSpans': [{
+            'resource': {'attributes': [self._otel_attribute('service.name', self.service)]},
+            'scopeSpans': [{'scope': {'name': 'stock_tracing'}, 'spans': spans}]
+        }]}
+
+    def _unix_nanos(self, perf_time):
+        return int((self._wall_origin + perf_time - self._perf_origin) * 1e9)
+
+    @staticmethod
+    def _otel_attribute(key, value):
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        return {'key': key, 'value': typed}
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 01:52:16 2026
+
+Per-ticker analysis units: a short LLM read of one stock, cached by
+(ticker, period, data version). A changed selection only needs units for
+the new tickers; the cross-stock tasks then synthesize the units.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from stock_agents import StockAgents
+from stock_llm_gateway import LLMGateway
+from stock_llm_cache import ResponseCache
+from stock_prompts import StockPrompts
+from stock_tracing import Tracer
+
+UNIT_SYSTEM = StockAgents.persona(StockAgents.ANALYST)
+
+UNIT_INSTRUCTIONS = (
+    "Give a read of this stock over the analysis period in at most 60 words: trend and momentum "
+    "(RSI, MACD, EMA), volatility and drawdown risk, and the one figure that matters most."
+)
+
+# Tokens for one ticker's figures; a one-row table always fits
+UNIT_TOKEN_BUDGET = 120
+
+
+class StockAnalysisUnits:
+    """Builds and caches the per-ticker units of a research run"""
+
+    def __init__(self, llm, cache=None, gateway=None, client='default', max_workers=8):
+        self.llm = llm
+        self.cache = cache
+        self.gateway = gateway or LLMGateway.shared()
+        self.client = client
+        self.max_workers = max_workers
+        self.model = getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or str(llm)
+        self.temperature = getattr(llm, 'temperature', None)
+        self.reused = 0
+        self.generated = 0
+
+    def analyze(self, summaries, period):
+        """ticker -> unit text for every StockSummary, generating only the ones not cached
+
+        Missing units are requested concurrently, so the gateway can batch them
+        into one multi-ticker call.
+        """
+        units, missing = {}, {}
+        for summary in summaries:
+            key = self.key(summary, period)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                units[summary.ticker] = cached
+            else:
+                missing[summary.ticker] = (summary, key)
+
+        with Tracer.span('units', tickers=len(summaries), cached=len(units), generated=len(missing)):
+            if missing:
+                with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stock-units') as executor:
+                    generate = Tracer.bind(lambda item: self._generate(*item))
+                    for ticker, text in zip(missing, executor.map(generate, missing.values())):
+                        units[ticker] = text
+
+        self.reused += len(summaries) - len(missing)
+        self.generated += len(missing)
+        return {summary.ticker: units[summary.ticker] for summary in summaries}
+
+    def key(self, summary, period):
+        unit = json.dumps([summary.ticker, period, summary.data_version, UNIT_INSTRUCTIONS])
+        return ResponseCache.make_key(self.model, self.temperature, 'unit', unit)
+
+    def _generate(self, summary, key):
+        figures = StockPrompts.build_payload([summary], UNIT_TOKEN_BUDGET)
+        text = self.gateway.batched(self.llm, UNIT_SYSTEM, UNIT_INSTRUCTIONS, summary.ticker, figures, self.client)
+        # A stock with no data version (no stored bars) is not worth remembering
+        if self.cache is not None and summary.data_version:
+            self.cache.set(key, text)
+        return text
+
+    @staticmethod
+    def to_prompt(units):
+        """The units as prompt text for the synthesis tasks"""
+        return "\n".join(f"{ticker}: {' '.join(text.split())}" for ticker, text in units.items())
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 09:20:05 2026
+
+S&P 500 constituent cache: in-process memo, on-disk snapshot with a TTL,
+stale-while-revalidate refresh and a bundled offline fallback
+"""
+
+import os
+import threading
+import time
+from io import StringIO
+
+import pandas as pd
+
+from stock_config import CACHE_DIR, DATA_DIR, SP500_TTL_SECONDS, SP500_URL
+from stock_resources import StockResources
+
+
+class StockUniverse:
+    """Compact local copy of the S&P 500 constituent table"""
+
+    COLUMNS = ['Symbol', 'Security', 'GICS Sector', 'GICS Sub-Industry']
+    SNAPSHOT_PATH = CACHE_DIR / 'sp500_constituents.csv'
+    # Offline fallback: only the ~100 largest constituents, not the full index
+    BUNDLED_PATH = DATA_DIR / 'sp500_constituents.csv'
+
+    # Minimum pause between two failed refresh attempts
+    RETRY_SECONDS = 300
+
+    _lock = threading.Lock()
+    _memo = None
+    _memo_saved_at = 0.0
+    _memo_partial = False
+    _refreshing = False
+    _last_attempt = 0.0
+
+    @classmethod
+    def get_constituents(cls, ttl=SP500_TTL_SECONDS):
+        """Return the constituent table, refreshing it in the background once stale"""
+        with cls._lock:
+            if cls._memo is None:
+                cls._memo, cls._memo_saved_at, cls._memo_partial = cls._load_local()
+            table, saved_at = cls._memo, cls._memo_saved_at
+
+        if table is None:
+            # Nothing on disk at all: the only option is a blocking download
+            return cls.refresh()
+
+        if time.time() - saved_at >= ttl:
+            cls._refresh_in_background()
+        return table
+
+    @classmethod
+    def is_partial(cls):
+        """True while the table served is the bundled fallback, which lacks most constituents"""
+        with cls._lock:
+            return cls._memo is not None and cls._memo_partial
+
+    @classmethod
+    def get_tickers(cls, ttl=SP500_TTL_SECONDS):
+        """Sorted list of constituent symbols"""
+        return sorted(cls.get_constituents(ttl)['Symbol'].tolist())
+
+    @classmethod
+    def get_sectors(cls, ttl=SP500_TTL_SECONDS):
+        """Sorted list of GICS sectors present in the index"""
+        return sorted(cls.get_constituents(ttl)['GICS Sector'].unique())
+
+    @staticmethod
+    def yahoo_symbol(symbol):
+        """Yahoo spelling of a Wikipedia symbol (share classes use '-', e.g. BRK.B -> BRK-B)"""
+        return symbol.replace('.', '-')
+
+    @classmethod
+    def get_sector_map(cls, ttl=SP500_TTL_SECONDS):
+        """Symbol -> GICS sector lookup"""
+        table = cls.get_constituents(ttl)
+        return dict(zip(table['Symbol'], table['GICS Sector']))
+
+    @classmethod
+    def refresh(cls):
+        """Download the table from Wikipedia and persist it as the new snapshot"""
+        cls._last_attempt = time.time()
+        table = cls._download()
+
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cls.SNAPSHOT_PATH.with_suffix('.tmp')
+        table.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, cls.SNAPSHOT_PATH)
+
+        with cls._lock:
+            cls._memo, cls._memo_saved_at, cls._memo_partial = table, time.time(), False
+        return table
+
+    @classmethod
+    def clear_memo(cls):
+        """Drop the in-process copy so the next call re-reads the disk snapshot"""
+        with cls._lock:
+            cls._memo, cls._memo_saved_at, cls._memo_partial = None, 0.0, False
+
+    @classmethod
+    def _download(cls):
+        response = StockResources.http_session().get(SP500_URL, timeout=30)
+        response.raise_for_status()
+        table = pd.read_html(StringIO(response.text))[0]
+        return cls._compact(table)
+
+    @classmethod
+    def _compact(cls, table):
+        table = table[cls.COLUMNS].dropna(subset=['Symbol'])
+        table = table.astype(str).drop_duplicates('Symbol')
+        return table.sort_values('Symbol').reset_index(drop=True)
+
+    @classmethod
+    def _load_local(cls):
+        """(table, saved at, partial) of the disk snapshot, else of the bundled file (stale and partial)"""
+        for path, bundled in ((cls.SNAPSHOT_PATH, False), (cls.BUNDLED_PATH, True)):
+            try:
+                table = cls._compact(pd.read_csv(path, dtype=str))
+            except (OSError, KeyError, ValueError):
+                continue
+            return table, 0.0 if bundled else path.stat().st_mtime, bundled
+        return None, 0.0, False
+
+    @classmethod
+    def _refresh_in_background(cls):
+        with cls._lock:
+            if cls._refreshing or time.time() - cls._last_attempt < cls.RETRY_SECONDS:
+                return
+            cls._refreshing = True
+            cls._last_attempt = time.time()
+
+        def worker():
+            try:
+                cls.refresh()
+            except Exception:
+                # Keep serving the stale copy; the next call retries after RETRY_SECONDS
+                pass
+            finally:
+                with cls._lock:
+                    cls._refreshing = False
+
+        threading.Thread(target=worker, name='sp500-refresh', daemon=True).start()
@@ -6,12 +6,28 @@ Created on Mon Dec  2 14:54:12 2024
 """
 
 import os
+import threading
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
 
+from stock_config import PRICE_SOURCE
+from stock_fundamentals import StockFundamentals
+from stock_indicators import StockIndicators
+from stock_records import StockSummary
+from stock_resources import StockResources
+from stock_store import PriceStore
+from stock_tracing import Tracer
+from stock_universe import StockUniverse
+
+_price_store = None
+_fundamentals = None
+# ticker -> (data version, indicator values); see StockUtils.indicators. The
+# pre-warmer fills it from its own thread, so it is only touched under the lock
+_indicator_cache = {}
+_indicator_lock = threading.Lock()
+
 class StockUtils:
     @staticmethod
     def load_environment():
@@ -21,35 +37,185 @@ class StockUtils:
 
     @staticmethod
     def get_sp500_tickers():
-        """Fetch S&P 500 stock tickers from Wikipedia"""
+        """Fetch S&P 500 stock tickers (cached locally, refreshed from Wikipedia)"""
         try:
-            sp500_table = pd.read_html('https://en.wikipedia.org/wiki/List_of_S%26P_500_companies')[0]
-            return sorted(sp500_table['Symbol'].tolist())
+            with Tracer.span('tickers') as span:
+                tickers = StockUniverse.get_tickers()
+                span.set(count=len(tickers))
+            return tickers
         except Exception as e:
             st.error(f"Error fetching S&P 500 tickers: {e}")
             return []
 
     @staticmethod
     def summarize_stock_data(ticker, period='1mo'):
-        """Fetch and summarize stock data for a given ticker"""
-        try:
-            stock = yf.Ticker(ticker)
-            
-            # Fetch historical data and minimal summary
-            hist = stock.history(period=period)
-            hist_summary = {
-                'ticker': ticker,
-                'price_change_pct': round((hist['Close'].iloc[-1] / hist['Close'].iloc[0] - 1) * 100, 2),
-            }
-            
-            # Get key statistics
-            info = stock.info
-            hist_summary.update({
-                'sector': info.get('sector', 'N/A'),
-                'current_price': round(info.get('currentPrice', 0), 2)
-            })
-            
-            return hist_summary
-        except Exception as e:
-            st.warning(f"Could not fetch data for {ticker}: {e}")
-            return None
\ No newline at end of file
+        """Fetch and summarize stock data for a given ticker; raises the ticker's error if it fails"""
+        summaries, errors = StockUtils.collect_summaries([ticker], period)
+        if ticker in errors:
+            raise errors[ticker]
+        return summaries[0]
+
+    @staticmethod
+    def summarize_stocks(tickers, period='1mo', max_workers=8, timeout=30):
+        """Fetch and summarize several tickers, skipping the ones that fail"""
+        summaries, errors = StockUtils.collect_summaries(tickers, period, max_workers, timeout)
+        # Streamlit calls must stay on the script thread, so failures are reported here
+        for ticker, error in errors.items():
+            st.warning(f"Could not fetch data for {ticker}: {error}")
+        return summaries
+
+    @staticmethod
+    def collect_summaries(tickers, period='1mo', max_workers=8, timeout=30, executor=None):
+        """StockSummary records of the tickers that could be fetched, plus a ticker -> error dict for the rest
+
+        `executor` (an AnalysisExecutor) runs the per-ticker risk analytics; serial by default.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        store = StockUtils.price_store()
+        # Indicators need the full stored history; the price change only the selected period
+        with Tracer.span('history', tickers=len(tickers)) as span:
+            misses = store.misses
+            full_history = store.get_history(tickers, 'max')
+            span.set(downloads=store.misses - misses)
+        history = PriceStore.slice_period(full_history, period)
+        price_changes = StockUtils.price_change_pct(history).dropna()
+        indicators = {}
+        if not full_history.empty:
+            with Tracer.span('indicators', tickers=len(price_changes)):
+                indicators = StockUtils.indicators(full_history, executor)
+
+        # Price from the last stored bar, sector from the constituent table;
+        # only tickers outside the table need a network lookup
+        with Tracer.span('info', tickers=len(price_changes)):
+            fundamentals, info_errors = StockUtils.fundamentals().get_many(
+                [ticker for ticker in tickers if ticker in price_changes.index],
+                ['currentPrice', 'sector'], full_history, max_workers, timeout
+            )
+
+        errors = {}
+        for ticker in tickers:
+            if ticker not in price_changes.index:
+                errors[ticker] = store.errors.get(ticker, "no price history")
+            elif ticker in info_errors:
+                errors[ticker] = info_errors[ticker]
+
+        summaries = [
+            StockSummary(
+                ticker=ticker,
+                price_change_pct=float(price_changes[ticker]),
+                sector=values.get('sector', 'N/A'),
+                current_price=round(values.get('currentPrice', 0), 2),
+                indicators=indicators[ticker],
+                data_version=StockUtils.data_version(ticker)
+            )
+            for ticker, values in fundamentals.items() if ticker not in info_errors
+        ]
+        return summaries, errors
+
+    @staticmethod
+    def indicators(history, executor=None):
+        """ticker -> indicator values, recomputed only for tickers whose latest bar changed
+
+        Pre-warmed tickers are served from the cache, so an interactive run
+        only computes indicators for tickers nobody asked for recently.
+        """
+        close = history.xs('Close', axis=1, level='Price')
+        last_dates = close.apply(pd.Series.last_valid_index)
+        last_closes = close.ffill().iloc[-1]
+        # The first close changes when the store re-bases a history after a split or dividend
+        first_closes = close.bfill().iloc[0]
+        versions = {ticker: (last_dates[ticker], last_closes[ticker], first_closes[ticker]) for ticker in close.columns}
+
+        with _indicator_lock:
+            cached = {ticker: _indicator_cache.get(ticker, (None, None)) for ticker in versions}
+        changed = [ticker for ticker, version in versions.items() if cached[ticker][0] != version]
+        if changed:
+            # Computed outside the lock; two threads at worst compute the same values twice
+            subset = history if len(changed) == len(versions) else history[changed]
+            table = StockIndicators.snapshot_table(subset, executor).join(StockIndicators.risk_table(subset, executor))
+            with _indicator_lock:
+                for ticker in changed:
+                    cached[ticker] = _indicator_cache[ticker] = (
+                        versions[ticker], table.loc[ticker].dropna().round(2).to_dict()
+                    )
+        return {ticker: cached[ticker][1] for ticker in versions}
+
+    @staticmethod
+    def clear_indicator_cache():
+        """Forget every ticker's indicators, so the next call recomputes them"""
+        with _indicator_lock:
+            _indicator_cache.clear()
+
+    @staticmethod
+    def data_version(ticker):
+        """'<last bar date>:<last close>' of the history behind a ticker's latest indicators"""
+        with _indicator_lock:
+            entry = _indicator_cache.get(ticker)
+        if entry is None:
+            return ''
+        last_date, last_close, _ = entry[0]
+        return f"{last_date:%Y-%m-%d}:{last_close:.4f}"
+
+    @staticmethod
+    def fundamentals():
+        """Process-wide field-selective key statistics accessor"""
+        global _fundamentals
+        if _fundamentals is None:
+            _fundamentals = StockFundamentals()
+        return _fundamentals
+
+    @staticmethod
+    def price_store():
+        """Process-wide local price store, topped up through download_history"""
+        global _price_store
+        if _price_store is None:
+            _price_store = PriceStore(StockUtils.download_history)
+        return _price_store
+
+    @staticmethod
+    def download_history(tickers, period='1mo', start=None):
+        """Download OHLCV history for many tickers
+
+        Returns a single frame indexed by date whose columns are keyed by
+        (ticker, field). Tickers Yahoo returned nothing for are dropped; with
+        the async source their MarketDataError is in `frame.attrs['errors']`.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=['Ticker', 'Price']))
+        # Market-data clients are only imported once prices are actually fetched
+        if PRICE_SOURCE == 'async':
+            from stock_market_data import AsyncMarketDataClient
+            return AsyncMarketDataClient.download(tickers, period, start)
+
+        import yfinance as yf
+
+        window = {'start': start} if start is not None else {'period': period}
+        history = yf.download(
+            tickers,
+            **window,
+            group_by='ticker',
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+            session=StockResources.http_session()
+        )
+        if history is None:
+            history = pd.DataFrame()
+        if not isinstance(history.columns, pd.MultiIndex):
+            history.columns = pd.MultiIndex.from_product([tickers[:1], history.columns])
+        history.columns = history.columns.set_names(['Ticker', 'Price'])
+
+        if isinstance(history.index, pd.DatetimeIndex) and history.index.tz is not None:
+            history.index = history.index.tz_localize(None)
+        return history.dropna(axis=1, how='all').dropna(axis=0, how='all')
+
+    @staticmethod
+    def price_change_pct(history):
+        """Percent change from the first to the last close of every ticker in a batch frame"""
+        if history.empty:
+            return pd.Series(dtype='float64')
+        close = history.xs('Close', axis=1, level='Price')
+        first = close.bfill().iloc[0]
+        last = close.ffill().iloc[-1]
+        return ((last / first - 1) * 100).round(2)
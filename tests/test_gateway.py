@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:22:09 2026
+
+LLM gateway: single-flight sharing, batch splitting and fair token budget
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from stock_limits import FairTokenBudget
+from stock_llm_gateway import SECTION_MARKER, LLMGateway
+
+
+class StubModel:
+    """Chat model answering through `answer(prompt)` and recording every prompt"""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+
+    def invoke(self, messages):
+        prompt = messages[-1][1]
+        self.prompts.append(prompt)
+        return SimpleNamespace(content=self.answer(prompt))
+
+
+class GateBucket:
+    """Token bucket that grants nothing until opened, then records each grant's size"""
+
+    capacity = 100
+
+    def __init__(self):
+        self.open = False
+        self.granted = []
+
+    def try_acquire(self, tokens):
+        if not self.open:
+            return 0.01
+        self.granted.append(tokens)
+        return 0.0
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def run_threads(targets):
+    """Results (or raised exceptions) of running the callables on threads at once"""
+    results = [None] * len(targets)
+
+    def run(index, target):
+        try:
+            results[index] = target()
+        except BaseException as e:
+            results[index] = e
+
+    # Daemons, so a caller left waiting fails the test instead of hanging the run
+    threads = [threading.Thread(target=run, args=(index, target), daemon=True) for index, target in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive(), "caller left waiting"
+    return results
+
+
+def sections(answers):
+    return "\n".join(f"{SECTION_MARKER}{item}\n{answer}" for item, answer in answers.items())
+
+
+def test_identical_calls_in_flight_are_sent_once():
+    gateway = LLMGateway(tokens_per_minute=100000)
+    release = threading.Event()
+    produced = []
+
+    def produce():
+        produced.append(True)
+        release.wait(5)
+        return "answer"
+
+    results = []
+    callers = [threading.Thread(target=lambda client=client: results.append(gateway.call('key', produce, 10, client)))
+               for client in range(3)]
+    for thread in callers:
+        thread.start()
+    wait_for(lambda: gateway.stats()['deduplicated'] == 2)
+    release.set()
+    for thread in callers:
+        thread.join(timeout=5)
+
+    assert results == ["answer"] * 3
+    assert len(produced) == 1
+    assert gateway.stats()['calls'] == 1
+
+
+def test_batched_answer_is_split_per_item():
+    # The model writes a marker heading of its own inside AAPL's answer
+    answer = sections({'AAPL': f"Buy.\n{SECTION_MARKER}Summary\nStrong trend.", 'MSFT': "Hold."})
+    model = StubModel(lambda prompt: answer)
+    gateway = LLMGateway(tokens_per_minute=100000, batch_window=5, max_batch=2)
+
+    results = run_threads([
+        lambda: gateway.batched(model, "system", "Rate each stock", 'AAPL', "AAPL rsi 61"),
+        lambda: gateway.batched(model, "system", "Rate each stock", 'MSFT', "MSFT rsi 44")
+    ])
+
+    assert results == [f"Buy.\n{SECTION_MARKER}Summary\nStrong trend.", "Hold."]
+    assert len(model.prompts) == 1
+    assert gateway.stats()['batched_items'] == 2
+
+
+def test_item_missing_from_batched_answer_is_asked_alone():
+    model = StubModel(lambda prompt: sections({'AAPL': "Buy."}) if SECTION_MARKER in prompt else "Sell.")
+    gateway = LLMGateway(tokens_per_minute=100000, batch_window=5, max_batch=2)
+
+    results = run_threads([
+        lambda: gateway.batched(model, "system", "Rate each stock", 'AAPL', "AAPL rsi 61"),
+        lambda: gateway.batched(model, "system", "Rate each stock", 'MSFT', "MSFT rsi 44")
+    ])
+
+    assert results == ["Buy.", "Sell."]
+    assert len(model.prompts) == 2
+    assert model.prompts[1] == "Rate each stock\n\nMSFT rsi 44"
+
+
+@pytest.mark.parametrize('error', [RuntimeError("provider down"), KeyboardInterrupt()])
+def test_batch_failure_reaches_every_caller(error):
+    def fail(prompt):
+        raise error
+
+    model = StubModel(fail)
+    gateway = LLMGateway(tokens_per_minute=100000, batch_window=5, max_batch=2)
+    results = run_threads([
+        lambda: gateway.batched(model, "system", "Rate each stock", 'AAPL', "AAPL rsi 61"),
+        lambda: gateway.batched(model, "system", "Rate each stock", 'MSFT', "MSFT rsi 44")
+    ])
+
+    assert results == [error, error]
+
+
+def test_budget_serves_clients_round_robin():
+    bucket = GateBucket()
+    budget = FairTokenBudget(bucket)
+    # Token counts tell the grants apart: A queues three calls, then B one
+    requests = [('A', 1), ('A', 2), ('A', 3), ('B', 10)]
+    threads = []
+    for client, tokens in requests:
+        threads.append(threading.Thread(target=budget.acquire, args=(client, tokens)))
+        threads[-1].start()
+        wait_for(lambda: budget.waiting() == len(threads))
+
+    bucket.open = True
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert bucket.granted == [1, 10, 2, 3]
+    assert budget.waiting() == 0
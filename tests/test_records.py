@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 12:04:51 2026
+
+StockSummary <-> DataFrame round trip
+"""
+
+from stock_records import StockSummary
+
+
+def test_summary_frame_round_trip():
+    summaries = [
+        StockSummary('AAPL', 1.25, 'Information Technology', 180.5, {'rsi_14': 61.2, 'ema_20': 178.4}, '2026-10-16:180.5000'),
+        StockSummary('XOM', -0.4, 'Energy', 112.0, {'rsi_14': 44.0}, '2026-10-16:112.0000')
+    ]
+
+    restored = StockSummary.from_frame(StockSummary.to_frame(summaries))
+
+    assert restored == summaries
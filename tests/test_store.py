@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 15:03:41 2026
+
+PriceStore: incremental top-ups and re-basing after a split
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from stock_store import FIELDS, PriceStore
+
+
+class FakeDownloader:
+    """Serves the bars in `bars` (ticker -> OHLCV frame) like StockUtils.download_history"""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.requests = []
+
+    def __call__(self, tickers, period=None, start=None):
+        self.requests.append((tuple(tickers), period, start))
+        frames = {
+            ticker: self.bars[ticker] if start is None else self.bars[ticker].loc[start:]
+            for ticker in tickers if ticker in self.bars
+        }
+        return pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+
+
+def bars(closes, start='2026-09-01'):
+    dates = pd.bdate_range(start, periods=len(closes), name='Date')
+    closes = np.asarray(closes, dtype='float64')
+    return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes,
+                         'Volume': np.full(len(closes), 1000.0)}, index=dates)[FIELDS]
+
+
+def expire(store, ticker):
+    """Make the stored bars look checked long ago"""
+    os.utime(store._path(ticker), (0, 0))
+
+
+def test_update_downloads_only_new_bars(tmp_path):
+    download = FakeDownloader({'AAPL': bars([100, 101, 102])})
+    store = PriceStore(download, root=tmp_path, base_period='1y')
+    store.update(['AAPL'])
+
+    download.bars['AAPL'] = bars([100, 101, 102, 103, 104])
+    expire(store, 'AAPL')
+    store.update(['AAPL'])
+
+    # The top-up starts at the second-to-last stored bar, the overlap that reveals a re-adjustment
+    assert download.requests[-1] == (('AAPL',), None, '2026-09-02')
+    assert store.read('AAPL')['Close'].tolist() == [100, 101, 102, 103, 104]
+
+
+def test_split_replaces_the_stored_history(tmp_path):
+    download = FakeDownloader({'AAPL': bars([100, 102, 104, 106]), 'MSFT': bars([50, 51, 52, 53])})
+    store = PriceStore(download, root=tmp_path, base_period='1y')
+    store.update(['AAPL', 'MSFT'])
+
+    # 2:1 split in AAPL: the provider re-adjusts its whole history and adds a bar
+    download.bars['AAPL'] = bars([50, 51, 52, 53, 54])
+    download.bars['MSFT'] = bars([50, 51, 52, 53, 54])
+    expire(store, 'AAPL')
+    expire(store, 'MSFT')
+    store.update(['AAPL', 'MSFT'])
+
+    assert store.read('AAPL')['Close'].tolist() == [50, 51, 52, 53, 54]
+    assert store.read('MSFT')['Close'].tolist() == [50, 51, 52, 53, 54]
+    # Only the re-based ticker is downloaded again from its first stored bar
+    assert download.requests[-1] == (('AAPL',), None, '2026-09-01')
+    assert not store.errors